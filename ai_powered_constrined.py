@@ -1,6 +1,8 @@
 import openai
 from typing import List, Dict
 import json
+import time
+from llm_usage import record_openai_response
 
 # Initialize Azure OpenAI client
 client = openai.AzureOpenAI(
@@ -31,6 +33,7 @@ def generate_constraint_config(prompt: str) -> List[Dict]:
     Example output: [{"table": "customer", "type": "ScalarInequality", "params": {"column_name": "age", "relation": ">=", "value": 18}}]
     """
     
+    start = time.perf_counter()
     response = client.chat.completions.create(
         model="gpt-4",  # Use your deployment name
         messages=[
@@ -40,6 +43,7 @@ def generate_constraint_config(prompt: str) -> List[Dict]:
         temperature=0.1,
         max_tokens=500
     )
+    record_openai_response("generate_constraint_config", response, time.perf_counter() - start, model="gpt-4")
     
     # Extract and parse JSON from response
     try:
@@ -0,0 +1,238 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import infer_dtype
+
+BLOCK_ROWS = 65_536  # rows per fetchmany() call and initial buffer capacity
+
+# infer_dtype() results each buffer kind stores as-is (bool buffers take integers only if all 0/1)
+_ACCEPTS = {
+    "i": {"integer", "boolean", "empty"},
+    "u": {"integer", "boolean", "empty"},
+    "b": {"boolean", "integer", "empty"},
+    "f": {"floating", "integer", "mixed-integer-float", "boolean", "empty"},
+}
+
+
+# --- Column types ---
+def dtype_for_declared(declared):
+    """NumPy dtype for a SQLite declared column type, following SQLite's affinity rules"""
+    declared = (declared or "").upper()
+    if "INT" in declared:
+        return "int64"
+    if any(t in declared for t in ("REAL", "FLOA", "DOUB")):
+        return "float64"
+    if declared in ("BOOLEAN", "BOOL"):
+        return "bool"
+    return "object"
+
+
+def dtype_for_sqlalchemy(sql_type):
+    """NumPy dtype for a reflected SQLAlchemy column type"""
+    try:
+        python_type = sql_type.python_type
+    except NotImplementedError:
+        return "object"
+    if python_type is bool:
+        return "bool"
+    if python_type is int:
+        return "int64"
+    if python_type is float:
+        return "float64"
+    if python_type in (datetime.datetime, datetime.date):
+        return "datetime64[ns]"
+    # Decimal stays exact as objects; strings, bytes, JSON etc. are objects anyway
+    return "object"
+
+
+def sqlite_column_dtypes(conn, table, prefix=""):
+    """{prefix + column: dtype} from PRAGMA table_info"""
+    return {
+        f"{prefix}{name}": dtype_for_declared(declared)
+        for _, name, declared, *_ in conn.execute(f"PRAGMA table_info({table})")
+    }
+
+
+def table_dtypes(table):
+    """{column: dtype} for a reflected sqlalchemy.Table"""
+    return {column.name: dtype_for_sqlalchemy(column.type) for column in table.columns}
+
+
+# --- Buffers ---
+class _ColumnBuffer:
+    """Preallocated typed array for one column, with a NULL mask created on demand.
+
+    Declared types are checked, not trusted: SQLite allows any value in any
+    column, so an integer column holding REALs becomes float64 and one
+    holding anything else (text, blobs, out-of-range ints) becomes an
+    object column instead of truncating or failing.
+    """
+
+    def __init__(self, dtype, capacity):
+        self.dtype = np.dtype(dtype)
+        self.values = np.empty(capacity, dtype=self.dtype)
+        self.mask = None
+
+    def grow(self, capacity):
+        values = np.empty(capacity, dtype=self.dtype)
+        values[:len(self.values)] = self.values
+        self.values = values
+        if self.mask is not None:
+            mask = np.zeros(capacity, dtype=bool)
+            mask[:len(self.mask)] = self.mask
+            self.mask = mask
+
+    def _to_object(self, filled):
+        values = np.empty(len(self.values), dtype=object)
+        values[:filled] = self.values[:filled].tolist()
+        if self.mask is not None:
+            values[:filled][self.mask[:filled]] = None
+        self.dtype, self.values, self.mask = values.dtype, values, None
+
+    def _to_float(self, filled):
+        values = np.empty(len(self.values), dtype="float64")
+        values[:filled] = self.values[:filled]
+        if self.mask is not None:
+            values[:filled][self.mask[:filled]] = np.nan
+        self.dtype, self.values, self.mask = values.dtype, values, None
+
+    def fill(self, start, values):
+        """Write one block (a 1-D object array) at `start`.
+
+        The block's value types are inferred once with pandas' C-level
+        infer_dtype rather than checked value by value in Python.
+        """
+        end = start + len(values)
+        kind = self.dtype.kind
+        if kind not in _ACCEPTS:
+            try:
+                self.values[start:end] = values
+            except (TypeError, ValueError, OverflowError):
+                self._to_object(start)
+                self.values[start:end] = values
+            return
+
+        inferred = infer_dtype(values, skipna=True)
+        # Floats turn None into NaN by themselves; ints and bools need a mask
+        nulls = None
+        if kind != "f" and infer_dtype(values, skipna=False) != inferred:
+            nulls = pd.isna(values)
+            values = values.copy()
+            values[nulls] = 0
+        fits = inferred in _ACCEPTS[kind]
+        if fits and kind == "b" and inferred == "integer":
+            ints = values.astype(np.int64)
+            fits = not ((ints < 0) | (ints > 1)).any()
+        if fits:
+            try:
+                self.values[start:end] = values
+            except (TypeError, ValueError, OverflowError):
+                fits = False
+        if not fits:
+            if kind in "iu" and inferred in ("floating", "mixed-integer-float"):
+                self._to_float(start)
+            else:
+                self._to_object(start)
+            if nulls is not None:
+                values[nulls] = None
+            self.fill(start, values)
+            return
+        if nulls is not None:
+            if self.mask is None:
+                self.mask = np.zeros(len(self.values), dtype=bool)
+            self.mask[start:end] = nulls
+
+    def finish(self, n):
+        values = self.values[:n]
+        if self.mask is None or not self.mask[:n].any():
+            return values
+        mask = self.mask[:n]
+        if self.dtype.kind == "i":
+            return pd.arrays.IntegerArray(values, mask)
+        if self.dtype.kind == "b":
+            return pd.arrays.BooleanArray(values, mask)
+        return values
+
+
+# --- Readers ---
+def _column_names(result):
+    if hasattr(result, "keys"):  # SQLAlchemy Result
+        return list(result.keys())
+    return [d[0] for d in result.description]  # DB-API cursor
+
+
+def _block_columns(rows, width):
+    """Fetched rows as one contiguous object array per column"""
+    if rows and type(rows[0]) is tuple:
+        # Plain DB-API tuples: NumPy transposes the whole block in C
+        block = np.empty((len(rows), width), dtype=object, order="F")
+        block[:] = rows
+        return [block[:, i] for i in range(width)]
+    # Tuple-like rows (SQLAlchemy Row) take a slow path in NumPy; zip() them instead
+    columns = []
+    for values in zip(*rows):
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        columns.append(column)
+    return columns
+
+
+def read_columnar(result, dtypes=None, block_rows=BLOCK_ROWS):
+    """DataFrame from a DB-API cursor or SQLAlchemy result, filled column by column.
+
+    Rows are pulled with fetchmany(block_rows) into preallocated arrays of
+    the given dtypes ({column: dtype}; unknown columns are objects), which
+    double in size when full. A result that fits in the first block is
+    allocated at exactly its size. Integer/bool columns with NULLs become
+    pandas nullable arrays.
+
+    The win over pd.read_sql_query is peak memory (about 2x lower), not
+    speed: wall time is about the same, since most of it goes to fetching
+    the DB-API rows (see columnar_benchmark.py).
+    """
+    names = _column_names(result)
+    dtypes = dtypes or {}
+    rows = result.fetchmany(block_rows)
+    capacity = len(rows) if len(rows) < block_rows else 2 * block_rows
+    buffers = [_ColumnBuffer(dtypes.get(name, "object"), capacity) for name in names]
+    n = 0
+    while rows:
+        if n + len(rows) > capacity:
+            capacity = max(2 * capacity, n + len(rows))
+            for buffer in buffers:
+                buffer.grow(capacity)
+        for buffer, values in zip(buffers, _block_columns(rows, len(names))):
+            buffer.fill(n, values)
+        n += len(rows)
+        rows = result.fetchmany(block_rows)
+    return pd.DataFrame({name: buffer.finish(n) for name, buffer in zip(names, buffers)}, columns=names)
+
+
+def read_columnar_blocks(result, dtypes=None, block_rows=BLOCK_ROWS):
+    """Yield one typed DataFrame per fetchmany(block_rows) block, for results too big to hold whole.
+
+    An empty result yields a single empty frame, so callers still see its columns.
+    """
+    names = _column_names(result)
+    dtypes = dtypes or {}
+    rows = result.fetchmany(block_rows)
+    if not rows:
+        yield pd.DataFrame({name: _ColumnBuffer(dtypes.get(name, "object"), 0).finish(0) for name in names},
+                           columns=names)
+        return
+    while rows:
+        buffers = [_ColumnBuffer(dtypes.get(name, "object"), len(rows)) for name in names]
+        for buffer, values in zip(buffers, _block_columns(rows, len(names))):
+            buffer.fill(0, values)
+        yield pd.DataFrame({name: buffer.finish(len(rows)) for name, buffer in zip(names, buffers)}, columns=names)
+        rows = result.fetchmany(block_rows)
+
+
+def read_sql_columnar(conn, sql, params=None, dtypes=None, block_rows=BLOCK_ROWS):
+    """read_columnar() for a query on a sqlite3/DB-API connection"""
+    cursor = conn.execute(sql, params or {})
+    try:
+        return read_columnar(cursor, dtypes, block_rows)
+    finally:
+        cursor.close()
@@ -1,11 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, BackgroundTasks
 from pydantic import BaseModel
 from fastapi.responses import HTMLResponse
-from langchain_community.utilities import SQLDatabase
-from langchain.agents import create_react_agent, AgentExecutor
-from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_community.chat_models import AzureChatOpenAI
+from sqlalchemy import create_engine
+from collections import OrderedDict
+from datetime import datetime
+import html
+import logging
+import threading
 import os
+from llm_usage import UsageCallbackHandler
+from metadata_cache import catalog_fingerprint, reflect_metadata
 
 app = FastAPI()
 
@@ -13,47 +18,141 @@ app = FastAPI()
 AZURE_DEPLOYMENT = "gpt-4-1106"
 AZURE_API_VERSION = "2024-05-01-preview"
 
+# --- Shared state: engines, LLM and analyses per schema fingerprint ---
+ENGINES = {}                     # db_uri -> Engine
+ANALYSIS_CACHE = OrderedDict()   # catalog fingerprint -> analysis
+LATEST_FINGERPRINT = {}          # (db_uri, schema) -> fingerprint of the last analysis
+MAX_CACHED_ANALYSES = 64
+_refreshing = set()
+_lock = threading.Lock()
+_llm = None
+
 class SchemaAnalysisRequest(BaseModel):
     db_type: str
     db_uri: str  # Full connection URI like sqlite:///my.db
     schema: str = None  # Optional
 
-@app.post("/analyze-schema", response_class=HTMLResponse)
-def analyze_schema(req: SchemaAnalysisRequest):
-    # --- Step 1: Initialize DB and LLM ---
-    db = SQLDatabase.from_uri(
-        req.db_uri,
-        include_foreign_keys=True,
-        view_support=True,
+def get_engine(db_uri):
+    if db_uri not in ENGINES:
+        ENGINES[db_uri] = create_engine(db_uri)
+    return ENGINES[db_uri]
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        _llm = AzureChatOpenAI(
+            deployment_name=AZURE_DEPLOYMENT,
+            api_version=AZURE_API_VERSION,
+            temperature=0,
+            max_retries=2
+        )
+    return _llm
+
+# --- Step 1: Fingerprint the catalog (one query), read it only when needed ---
+def read_catalog(engine, schema=None):
+    """Tables, columns and declared FKs from the reflected-metadata cache"""
+    catalog = {}
+    for table in sorted(reflect_metadata(engine, schema).tables.values(), key=lambda t: t.name):
+        catalog[table.name] = {
+            "columns": [f"{c.name} {c.type}" for c in table.columns],
+            "foreign_keys": [
+                {"columns": [c.name for c in fk.columns], "parent": fk.referred_table.name,
+                 "parent_columns": [e.column.name for e in fk.elements]}
+                for fk in table.foreign_key_constraints
+            ],
+        }
+    return catalog
+
+# --- Step 2: Declared relationships straight from the catalog ---
+def declared_relationships(catalog):
+    return [
+        {"child": table, "child_columns": fk["columns"], "parent": fk["parent"], "parent_columns": fk["parent_columns"]}
+        for table, info in catalog.items()
+        for fk in info["foreign_keys"]
+    ]
+
+# --- Step 3: Ask the LLM only about relationships that aren't declared ---
+def infer_undeclared_relationships(catalog, declared, schema_label=None):
+    schema_text = "\n".join(f"- {t}({', '.join(info['columns'])})" for t, info in catalog.items())
+    known = "\n".join(
+        f"- {r['child']}({', '.join(r['child_columns'])}) -> {r['parent']}({', '.join(r['parent_columns'])})"
+        for r in declared
+    ) or "- none"
+    prompt = (
+        "Here is a database schema:\n" + schema_text +
+        "\n\nThese foreign keys are already declared and must NOT be repeated:\n" + known +
+        "\n\nList and explain only the relationships between tables that are implied by naming "
+        "or usage but NOT declared above. Be concise and use markdown. "
+        "If there are none, say so."
     )
+    usage = UsageCallbackHandler("analyze_schema", schema=schema_label)
+    return get_llm().invoke(prompt, config={"callbacks": [usage]}).content
 
-    llm = AzureChatOpenAI(
-        deployment_name=AZURE_DEPLOYMENT,
-        api_version=AZURE_API_VERSION,
-        temperature=0,
-        max_retries=2
+def render_analysis(declared, inferred):
+    rows = "".join(
+        f"<tr><td>{html.escape(r['child'])}.{html.escape(', '.join(r['child_columns']))}</td>"
+        f"<td>{html.escape(r['parent'])}.{html.escape(', '.join(r['parent_columns']))}</td></tr>"
+        for r in declared
+    )
+    return (
+        "<html><body><h2>🧠 Inferred Table Relationships</h2>"
+        f"<h3>Declared foreign keys ({len(declared)})</h3>"
+        f"<table><tr><th>Child</th><th>Parent</th></tr>{rows}</table>"
+        f"<h3>Undeclared relationships</h3><div>{inferred}</div>"
+        "</body></html>"
     )
 
-    # --- Step 2: Use LangChain SQL Toolkit ---
-    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-    tools = toolkit.get_tools()
-    agent = create_react_agent(llm=llm, tools=tools)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
-
-    # --- Step 3: Run prompt to get relationships ---
-    prompt = "List and explain all relationships between tables in the database. Be detailed and use markdown."
-    response = agent_executor.invoke({"input": prompt})
-
-    # --- Step 4: Return formatted response ---
-    html_response = f"<html><body><h2>🧠 Inferred Table Relationships</h2><div>{response['output']}</div></body></html>"
-    return HTMLResponse(content=html_response, status_code=200)
-
-if st.button("🧠 Analyze Relationships with GPT"):
-    with st.spinner("Analyzing..."):
-        res = requests.post("http://localhost:8000/analyze-schema", json={"db_uri": db_uri, "db_type": db_type})
-        if res.status_code == 200:
-            components.html(res.text, height=650, scrolling=True)
-        else:
-            st.error("Failed to fetch relationship analysis.")
-[A[A[A[A[A[A[A[A[A
-[A
+def build_analysis(key, fingerprint, catalog):
+    declared = declared_relationships(catalog)
+    inferred = infer_undeclared_relationships(catalog, declared, schema_label=f"{key[0]}/{key[1] or ''}")
+    analysis = {
+        "fingerprint": fingerprint,
+        "html": render_analysis(declared, inferred),
+        "analyzed_at": datetime.utcnow().isoformat(),
+    }
+    with _lock:
+        ANALYSIS_CACHE[fingerprint] = analysis
+        ANALYSIS_CACHE.move_to_end(fingerprint)
+        while len(ANALYSIS_CACHE) > MAX_CACHED_ANALYSES:
+            ANALYSIS_CACHE.popitem(last=False)
+        LATEST_FINGERPRINT[key] = fingerprint
+    return analysis
+
+def refresh_analysis(key, fingerprint, engine, schema):
+    try:
+        build_analysis(key, fingerprint, read_catalog(engine, schema))
+        logging.info(f"🔄 Refreshed schema analysis for {key[0]} ({fingerprint[:12]})")
+    except Exception as e:
+        logging.error(f"❌ Schema analysis refresh failed: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(fingerprint)
+
+@app.post("/analyze-schema", response_class=HTMLResponse)
+def analyze_schema(req: SchemaAnalysisRequest, background_tasks: BackgroundTasks):
+    key = (req.db_uri, req.schema)
+    engine = get_engine(req.db_uri)
+    fingerprint = catalog_fingerprint(engine, req.schema)
+
+    # --- Unchanged schema: serve the stored analysis ---
+    with _lock:
+        cached = ANALYSIS_CACHE.get(fingerprint)
+        stale = ANALYSIS_CACHE.get(LATEST_FINGERPRINT.get(key))
+        if cached:
+            ANALYSIS_CACHE.move_to_end(fingerprint)
+            LATEST_FINGERPRINT[key] = fingerprint
+    if cached:
+        return HTMLResponse(content=cached["html"], status_code=200, headers={"X-Schema-Analysis": "cached"})
+
+    # --- Schema changed since the last analysis: serve it while refreshing in the background ---
+    if stale:
+        with _lock:
+            schedule = fingerprint not in _refreshing
+            _refreshing.add(fingerprint)
+        if schedule:
+            background_tasks.add_task(refresh_analysis, key, fingerprint, engine, req.schema)
+        return HTMLResponse(content=stale["html"], status_code=200, headers={"X-Schema-Analysis": "stale"})
+
+    # --- First request for this schema ---
+    analysis = build_analysis(key, fingerprint, read_catalog(engine, req.schema))
+    return HTMLResponse(content=analysis["html"], status_code=200, headers={"X-Schema-Analysis": "fresh"})
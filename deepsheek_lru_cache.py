@@ -5,15 +5,24 @@ from langchain_openai import AzureChatOpenAI
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import AgentExecutor, create_openai_tools_agent
+from sql_guard import QueryGuard, guard_tools
+from executor_registry import EXECUTOR_REGISTRY, executor_fingerprint, llm_config
+from llm_usage import UsageCallbackHandler
 
 class LangChainSQLAgent:
+    EXECUTOR_OPTIONS = {
+        "verbose": False,
+        "handle_parsing_errors": True,
+        "early_stopping_method": "generate",
+        "return_intermediate_steps": False
+    }
+
     def __init__(self, conn_str, azure_config):
         self.conn_str = conn_str
         self.azure_config = azure_config['azure_config']
         self.db = None
         self.llm = None
         self.tools = None
-        self._executor_cache = {}  # Cache for executors
         self._initialize_core_components()
         # Create a cached version of the run_query method
         self._cached_run_query = lru_cache(maxsize=128)(self._uncached_run_query)
@@ -42,18 +51,18 @@ class LangChainSQLAgent:
 
     def _setup_tools(self):
         toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-        self.tools = toolkit.get_tools()
+        self.guard = QueryGuard(self.db._engine)
+        self.tools = guard_tools(toolkit.get_tools(), self.guard)
         print("Tools Initialized:", self.tools)
 
     def create_agent_executor(self, system_prompt):
-        # Use normalized prompt as cache key
+        # Executors are shared across agents, keyed by what they are built from
         normalized_prompt = system_prompt.strip()
-        
-        # Check if executor exists in cache
-        if normalized_prompt in self._executor_cache:
-            return self._executor_cache[normalized_prompt]
-        
-        # Create new executor if not cached
+        key = executor_fingerprint(normalized_prompt, llm_config(self.llm), self.tools, scope=self.conn_str,
+                                   executor_options=self.EXECUTOR_OPTIONS)
+        return EXECUTOR_REGISTRY.get_or_create(key, lambda: self._build_agent_executor(normalized_prompt))
+
+    def _build_agent_executor(self, system_prompt):
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("human", "{input}"),
@@ -64,18 +73,7 @@ class LangChainSQLAgent:
             tools=self.tools,
             prompt=prompt
         )
-        executor = AgentExecutor(
-            agent=agent,
-            tools=self.tools,
-            verbose=False,
-            handle_parsing_errors=True,
-            early_stopping_method="generate",
-            return_intermediate_steps=False
-        )
-        
-        # Cache the executor
-        self._executor_cache[normalized_prompt] = executor
-        return executor
+        return AgentExecutor(agent=agent, tools=self.tools, **self.EXECUTOR_OPTIONS)
 
     def prepare_inputs(self, query, top_k):
         return {
@@ -96,13 +94,14 @@ class LangChainSQLAgent:
         """Actual query execution without caching"""
         agent_executor = self.create_agent_executor(system_prompt)
         prepared_input = self.prepare_inputs(query, top_k)
-        result = agent_executor.invoke(prepared_input)
+        usage = UsageCallbackHandler("LangChainSQLAgent.run_query", schema=self.conn_str)
+        result = agent_executor.invoke(prepared_input, config={"callbacks": [usage]})
         return result["output"]
     
     def cache_info(self):
         """Get cache statistics"""
         return {
             "run_query": self._cached_run_query.cache_info(),
-            "executors": len(self._executor_cache)
+            "executors": EXECUTOR_REGISTRY.info()
         }
 
@@ -1,13 +1,48 @@
 import numpy as np
 import pandas as pd
-from sklearn.metrics.pairwise import cosine_similarity
 import sqlite3
 import re
-from openai import OpenAI  # Requires openai package
 import os
+import time
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from embedding_backends import get_backend
+from embedding_store import get_store
+from vector_index import INDEX_DTYPE, VectorIndex, IVFIndex, PartitionedVectorIndex
+from embedding_cache import EmbeddingCache
+from lexical_index import LexicalIndex
+from join_planner import JoinPlanner
+from lazy_service import LazyService
+from columnar_reader import read_sql_columnar, sqlite_column_dtypes
+from result_cache import ResultCache, ColumnarFrame, cache_key, install_version_triggers, table_versions
+
+# Batching limits for index builds (the embeddings API accepts lists of inputs)
+MAX_BATCH_ITEMS = 256            # inputs per request
+MAX_BATCH_CHARS = 100_000        # ~25k tokens per request, well under the API limit
+MAX_CONCURRENT_BATCHES = 4       # requests in flight at once
+MAX_REQUESTS_PER_SECOND = 5      # stay under the deployment's rate limit
+
+# Column indexes at least this large use approximate (IVF) search
+ANN_MIN_COLUMNS = 50_000
+ANN_N_PROBE = 32                 # cells scanned per lookup; ~0.91 recall@10 at ~5x exact speed (ann_benchmark.py)
+
+# Reference rows are fetched by primary key in batches, and read back in chunks
+REFERENCE_BIND_LIMIT = 999       # SQLite bound variables per statement; sizes each key chunk
+REFERENCE_FETCH_ROWS = 1000      # rows pulled from the cursor at a time
+
+# Prepared statements kept per connection; generated SQL only varies by shape, not by value
+STATEMENT_CACHE_SIZE = 256
+SQL_OPERATORS = {"=", "!=", "<", "<=", ">", ">="}
+
+# Shared-cache in-memory database: every thread gets its own connection to the same data
+DATABASE_URI = "file:embading_deep?mode=memory&cache=shared"
+SQL_WORKERS = int(os.getenv("SQL_WORKERS", "4"))  # threads running a batch's SQL
+
+# Repeated prompts are answered from cache until a table they read changes
+RESULT_CACHE_BYTES = 64 * 1024 * 1024
+QUERY_PLAN_CACHE_SIZE = 1024     # prompt -> generated SQL
 
-# Initialize OpenAI client (replace with your API key)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 # Database schema metadata with semantic descriptions
 SCHEMA_METADATA = {
@@ -55,51 +90,26 @@ SCHEMA_METADATA = {
     }
 }
 
-# Create in-memory database
-conn = sqlite3.connect(':memory:')
-cur = conn.cursor()
-
-# Create tables
-cur.execute("""
-CREATE TABLE country (
-    country_id INTEGER PRIMARY KEY,
-    name TEXT,
-    code TEXT,
-    population INTEGER
-)
-""")
-
-cur.execute("""
-CREATE TABLE area (
-    area_id INTEGER PRIMARY KEY,
-    country_id INTEGER,
-    name TEXT,
-    climate TEXT,
-    FOREIGN KEY(country_id) REFERENCES country(country_id)
-)
-""")
-
-cur.execute("""
-CREATE TABLE activity (
-    activity_id INTEGER PRIMARY KEY,
-    area_id INTEGER,
-    name TEXT,
-    type TEXT,
-    difficulty TEXT,
-    FOREIGN KEY(area_id) REFERENCES area(area_id)
-)
-""")
-
-cur.execute("""
-CREATE TABLE participant (
-    participant_id INTEGER PRIMARY KEY,
-    activity_id INTEGER,
-    name TEXT,
-    age INTEGER,
-    experience_level TEXT,
-    FOREIGN KEY(activity_id) REFERENCES activity(activity_id)
+def schema_items(schema_metadata):
+    """(kind, key, text, data) for every table and column description to embed"""
+    items = []
+    for table, metadata in schema_metadata.items():
+        table_text = f"Table: {table}. Description: {metadata['description']}"
+        items.append(("tables", table, table_text, {"metadata": metadata}))
+
+        for col, desc in metadata["columns"].items():
+            col_key = f"{table}.{col}"
+            col_text = f"Table: {table}, Column: {col}. Description: {desc}"
+            items.append(("columns", col_key, col_text, {"table": table, "column": col}))
+    return items
+
+# Embedding backend: OpenAI API by default, EMBEDDING_BACKEND=local for offline hashed n-grams
+embedding_backend = get_backend(
+    corpus=[text for _, _, text, _ in schema_items(SCHEMA_METADATA)],
+    model="text-embedding-3-small",
+    call_site="embading_deep.generate_embeddings"
 )
-""")
+EMBEDDING_MODEL = embedding_backend.name
 
 # Populate with sample data
 def populate_sample_data(conn):
@@ -147,79 +157,329 @@ def populate_sample_data(conn):
     
     conn.commit()
 
-populate_sample_data(conn)
+# Create in-memory database
+def create_database():
+    """Create the sample schema and data (built lazily on first use)"""
+    # Kept open for the life of the process: the shared in-memory database lives as long as it does
+    conn = sqlite3.connect(DATABASE_URI, uri=True, check_same_thread=False)
+    cur = conn.cursor()
+
+    # Create tables
+    cur.execute("""
+    CREATE TABLE country (
+        country_id INTEGER PRIMARY KEY,
+        name TEXT,
+        code TEXT,
+        population INTEGER
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE area (
+        area_id INTEGER PRIMARY KEY,
+        country_id INTEGER,
+        name TEXT,
+        climate TEXT,
+        FOREIGN KEY(country_id) REFERENCES country(country_id)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE activity (
+        activity_id INTEGER PRIMARY KEY,
+        area_id INTEGER,
+        name TEXT,
+        type TEXT,
+        difficulty TEXT,
+        FOREIGN KEY(area_id) REFERENCES area(area_id)
+    )
+    """)
+
+    cur.execute("""
+    CREATE TABLE participant (
+        participant_id INTEGER PRIMARY KEY,
+        activity_id INTEGER,
+        name TEXT,
+        age INTEGER,
+        experience_level TEXT,
+        FOREIGN KEY(activity_id) REFERENCES activity(activity_id)
+    )
+    """)
+    populate_sample_data(conn)
+    # Writes bump a per-table version, which is part of every result cache key
+    install_version_triggers(conn, SCHEMA_METADATA.keys())
+    return conn
+
+database = LazyService("embading_deep.database", create_database)
+
+_thread_local = threading.local()
+
+def get_connection():
+    """This thread's connection to the shared in-memory database (sqlite3 connections aren't thread-safe)"""
+    database.get()
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        conn = _thread_local.conn = sqlite3.connect(DATABASE_URI, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+    return conn
+
+# Join paths come from the database's declared foreign keys, computed once
+join_planner = LazyService("embading_deep.join_planner", lambda: JoinPlanner.from_sqlite(get_connection()))
 
 # Generate embeddings for schema metadata
 def generate_embeddings(text):
-    """Generate embeddings using OpenAI API"""
-    response = client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    return response.data[0].embedding
+    """Generate embeddings with the configured backend"""
+    return generate_embeddings_batch([text])[0]
+
+def generate_embeddings_batch(texts):
+    """Embed a list of texts in a single backend call, preserving input order"""
+    return embedding_backend.embed(texts)
+
+def pack_batches(texts, max_items=MAX_BATCH_ITEMS, max_chars=MAX_BATCH_CHARS):
+    """Split texts into batches bounded by item count and total size"""
+    batches, current, current_chars = [], [], 0
+    for text in texts:
+        if current and (len(current) >= max_items or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+class RateLimiter:
+    """Spaces request starts so at most `rate` requests begin per second"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next)
+            self._next = start_at + self.interval
+        time.sleep(max(0.0, start_at - now))
+
+_rate_limiter = RateLimiter(MAX_REQUESTS_PER_SECOND)
+
+# Prompt/phrase embeddings are memoized; schema descriptions go through the embedding store
+prompt_embeddings = EmbeddingCache(generate_embeddings_batch, EMBEDDING_MODEL, maxsize=4096)
+
+def embed_texts(texts):
+    """Embed many texts with size-bounded batches running a few at a time"""
+    if not embedding_backend.remote:
+        return generate_embeddings_batch(texts)
+    batches = pack_batches(texts)
+
+    def run(batch):
+        _rate_limiter.wait()
+        return generate_embeddings_batch(batch)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as pool:
+        results = list(pool.map(run, batches))
+    return [embedding for batch in results for embedding in batch]
 
 # Create semantic index for tables and columns
 def create_semantic_index():
     """Create embeddings for all table and column descriptions"""
+    start = time.perf_counter()
     index = {
         "tables": {},
         "columns": {}
     }
-    
-    # Embed table descriptions
-    for table, metadata in SCHEMA_METADATA.items():
-        table_text = f"Table: {table}. Description: {metadata['description']}"
-        index["tables"][table] = {
-            "embedding": generate_embeddings(table_text),
-            "metadata": metadata
-        }
-        
-        # Embed column descriptions
-        for col, desc in metadata["columns"].items():
-            col_key = f"{table}.{col}"
-            col_text = f"Table: {table}, Column: {col}. Description: {desc}"
-            index["columns"][col_key] = {
-                "embedding": generate_embeddings(col_text),
-                "table": table,
-                "column": col
-            }
-    
+
+    # Collect every table and column description first, then embed them in batches
+    items = schema_items(SCHEMA_METADATA)
+
+    # Only descriptions that aren't in the on-disk store yet go to the API
+    texts = [text for _, _, text, _ in items]
+    store = get_store(EMBEDDING_MODEL)
+    misses_before = store.misses
+    sent_batches = []
+
+    def embed_misses(missing):
+        sent_batches.extend(pack_batches(missing))
+        return embed_texts(missing)
+
+    embeddings = store.embed(EMBEDDING_MODEL, texts, embed_misses)
+    # Vectors live only in the (possibly quantized) indexes below, not in these dicts
+    for kind, key, _, data in items:
+        index[kind][key] = data
+    is_table = np.array([kind == "tables" for kind, _, _, _ in items])
+
+    # Pre-normalized matrices so a lookup is a single matrix-vector product
+    index["table_index"] = VectorIndex(
+        index["tables"].keys(),
+        embeddings[is_table],
+        payloads=[d["metadata"] for d in index["tables"].values()],
+        dtype=INDEX_DTYPE
+    )
+    column_index_cls = IVFIndex if len(index["columns"]) >= ANN_MIN_COLUMNS else VectorIndex
+    column_index_args = {"n_probe": ANN_N_PROBE} if column_index_cls is IVFIndex else {}
+    column_index_args["dtype"] = INDEX_DTYPE
+    # Columns are stored as one contiguous block per table for table-scoped lookups
+    index["column_index"] = PartitionedVectorIndex(
+        index["columns"].keys(),
+        embeddings[~is_table],
+        partitions=[d["table"] for d in index["columns"].values()],
+        payloads=list(index["columns"].values()),
+        index_cls=column_index_cls,
+        **column_index_args
+    )
+
+    elapsed = time.perf_counter() - start
+    index["stats"] = {
+        "items": len(items),
+        "embedded": store.misses - misses_before,
+        "batches": len(sent_batches),
+        "build_seconds": round(elapsed, 3),
+        "items_per_second": round(len(items) / elapsed, 1) if elapsed else None
+    }
+    print(f"Semantic index built: {index['stats']['items']} items in {elapsed:.2f}s "
+          f"({index['stats']['items_per_second']} items/sec, {index['stats']['embedded']} newly embedded)")
     return index
 
-# Create the semantic index
-semantic_index = create_semantic_index()
+# The semantic index is built on first use, or ahead of time with warm_up()
+semantic_index_service = LazyService("embading_deep.semantic_index", create_semantic_index)
+
+def get_semantic_index():
+    return semantic_index_service.get()
+
+# Lexical (BM25) index over the same names and descriptions; needs no embeddings
+LEXICAL_METRICS = Counter()      # "<kind>.<route>" -> lookups
+LEXICAL_MIN_SCORE = 1.5          # BM25 a name match needs to narrow; tokens many names share score below
+
+def index_lexically(lexicon, schema_metadata):
+    for table, metadata in schema_metadata.items():
+        lexicon["tables"].add(table, table, metadata["description"], payload=metadata)
+        for col, desc in metadata["columns"].items():
+            lexicon["columns"].add(f"{table}.{col}", col, desc,
+                                   payload={"table": table, "column": col}, group=table)
+
+def create_lexical_index():
+    lexicon = {"tables": LexicalIndex(), "columns": LexicalIndex()}
+    index_lexically(lexicon, SCHEMA_METADATA)
+    return lexicon
+
+lexical_index_service = LazyService("embading_deep.lexical_index", create_lexical_index)
+
+def lexical_route(kind, text, groups=None):
+    """How to resolve `text` against the tables or columns:
+
+    ("exact", [key])  - exactly one name is mentioned literally; no embedding needed
+    ("narrowed", keys) - names are mentioned; rank only those keys by embedding
+    ("full", None)     - nothing distinctive is named; search the whole embedding index
+
+    Names only count when the best one scores at least LEXICAL_MIN_SCORE
+    (BM25), so a token most names share ("id", "date") never prunes the
+    semantic search.
+    """
+    hits = lexical_index_service.get()[kind].lookup(text, groups=groups)
+    if not hits["candidates"] or max(hits["scores"].values()) < LEXICAL_MIN_SCORE:
+        return "full", None
+    if len(hits["exact"]) == 1:
+        return "exact", hits["exact"]
+    return "narrowed", hits["exact"] or hits["candidates"]
+
+def _lexical_result(kind, key):
+    return key, 1.0, lexical_index_service.get()[kind].payloads[key]
+
+def warm_up(background=True):
+    """Build the database and semantic index now instead of on the first prompt"""
+    database.warm_up(background)
+    join_planner.warm_up(background)
+    lexical_index_service.warm_up(background)
+    semantic_index_service.warm_up(background)
+
+def readiness():
+    services = [database.status(), join_planner.status(), lexical_index_service.status(), semantic_index_service.status()]
+    return {"ready": all(s["state"] == "ready" for s in services), "services": services}
+
+# Add a newly registered schema to the live index without rebuilding it
+def add_schema_to_index(schema_metadata):
+    """Embed and insert tables/columns from another SCHEMA_METADATA-style dict"""
+    semantic_index = get_semantic_index()
+    items = schema_items(schema_metadata)
+    tables = [(key, text, data["metadata"]) for kind, key, text, data in items if kind == "tables"]
+    columns = [(key, text, data) for kind, key, text, data in items if kind == "columns"]
+    store = get_store(EMBEDDING_MODEL)
+    table_vectors = store.embed(EMBEDDING_MODEL, [text for _, text, _ in tables], embed_texts)
+    column_vectors = store.embed(EMBEDDING_MODEL, [text for _, text, _ in columns], embed_texts)
+
+    for table, _, metadata in tables:
+        semantic_index["tables"][table] = {"metadata": metadata}
+    for key, _, data in columns:
+        semantic_index["columns"][key] = data
+    index_lexically(lexical_index_service.get(), schema_metadata)
+    # Prompts may now resolve to the new tables
+    with _query_plans_lock:
+        _query_plans.clear()
+    semantic_index["table_index"].add([t for t, _, _ in tables], table_vectors, payloads=[m for _, _, m in tables])
+    semantic_index["column_index"].add(
+        [k for k, _, _ in columns], column_vectors,
+        partitions=[d["table"] for _, _, d in columns],
+        payloads=[semantic_index["columns"][k] for k, _, _ in columns]
+    )
+    SCHEMA_METADATA.update(schema_metadata)
 
 # Find best matching table for a prompt
 def find_matching_table(prompt, top_n=3):
-    """Find the most relevant table using semantic similarity"""
-    prompt_embedding = generate_embeddings(prompt)
-    
-    similarities = []
-    for table, data in semantic_index["tables"].items():
-        sim = cosine_similarity([prompt_embedding], [data["embedding"]])[0][0]
-        similarities.append((table, sim, data["metadata"]))
-    
-    # Sort by similarity score
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:top_n]
+    """Find the most relevant table: lexical fast path first, then semantic similarity.
+
+    A single literally named table is returned on its own with score 1.0,
+    without calling the embeddings API.
+    """
+    route, keys = lexical_route("tables", prompt)
+    LEXICAL_METRICS[f"tables.{route}"] += 1
+    if route == "exact":
+        return [_lexical_result("tables", keys[0])]
+    prompt_embedding = prompt_embeddings.get(prompt)
+    table_index = get_semantic_index()["table_index"]
+    if route == "narrowed":
+        return table_index.search_keys(prompt_embedding, keys, top_k=top_n)
+    return table_index.search(prompt_embedding, top_k=top_n)
+
+def find_matching_tables_batch(prompts, top_n=3):
+    """find_matching_table for many prompts: one embeddings call for those that need it"""
+    prompts = list(prompts)
+    routes = [lexical_route("tables", p) for p in prompts]
+    embed = [p for p, (route, _) in zip(prompts, routes) if route != "exact"]
+    vectors = dict(zip(embed, prompt_embeddings.get_many(embed)))
+    table_index = get_semantic_index()["table_index"] if embed else None
+    # Unnamed prompts are still scored together with one matrix product
+    full = [p for p, (route, _) in zip(prompts, routes) if route == "full"]
+    full_results = dict(zip(full, table_index.search_batch([vectors[p] for p in full], top_k=top_n))) if full else {}
+
+    results = []
+    for prompt, (route, keys) in zip(prompts, routes):
+        LEXICAL_METRICS[f"tables.{route}"] += 1
+        if route == "exact":
+            results.append([_lexical_result("tables", keys[0])])
+        elif route == "narrowed":
+            results.append(table_index.search_keys(vectors[prompt], keys, top_k=top_n))
+        else:
+            results.append(full_results[prompt])
+    return results
 
 # Find best matching column for a prompt
 def find_matching_column(prompt, table=None, top_n=3):
-    """Find the most relevant column using semantic similarity"""
-    prompt_embedding = generate_embeddings(prompt)
-    
-    similarities = []
-    for col_key, data in semantic_index["columns"].items():
-        # If table is specified, only consider columns from that table
-        if table and data["table"] != table:
-            continue
-            
-        sim = cosine_similarity([prompt_embedding], [data["embedding"]])[0][0]
-        similarities.append((col_key, sim, data))
-    
-    # Sort by similarity score
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    return similarities[:top_n]
+    """Find the most relevant column: lexical fast path first, then semantic similarity.
+
+    `table` may be a table name or a list of table names; only those tables'
+    column blocks are scored.
+    """
+    tables = [table] if isinstance(table, str) else table or None
+    route, keys = lexical_route("columns", prompt, groups=tables)
+    LEXICAL_METRICS[f"columns.{route}"] += 1
+    if route == "exact":
+        return [_lexical_result("columns", keys[0])]
+    prompt_embedding = prompt_embeddings.get(prompt)
+    column_index = get_semantic_index()["column_index"]
+    if route == "narrowed":
+        return column_index.search_keys(prompt_embedding, keys, top_k=top_n)
+    return column_index.search(prompt_embedding, top_k=top_n, partitions=tables)
 
 # Extract conditions from prompt
 def parse_conditions(prompt):
@@ -255,53 +515,52 @@ def parse_conditions(prompt):
     
     return conditions
 
-# Find related tables based on schema relationships
-def find_related_tables(target_table, condition_tables):
-    """Find all tables related to target and condition tables"""
-    visited = set()
-    queue = [target_table] + condition_tables
-    related_tables = set()
-    
-    while queue:
-        current = queue.pop(0)
-        if current in visited:
-            continue
-            
-        visited.add(current)
-        related_tables.add(current)
-        
-        # Add relationships
-        for rel_table in SCHEMA_METADATA[current]["relationships"]:
-            if rel_table not in visited:
-                queue.append(rel_table)
-    
-    return related_tables
-
 # Generate SQL query based on prompt
-def generate_query_from_prompt(prompt):
-    """Convert natural language prompt to SQL query"""
-    # Step 1: Find the best matching table
-    table_matches = find_matching_table(prompt)
+def condition_phrases_to_embed(conditions, target_table):
+    """Condition phrases whose column can't be resolved lexically among the tables joinable to the target"""
+    reachable = sorted(join_planner.get().reachable(target_table))
+    return [
+        cond["column"] for cond in conditions
+        if lexical_route("columns", cond["column"], groups=reachable)[0] != "exact"
+    ]
+
+def generate_query_from_prompt(prompt, table_matches=None):
+    """Convert natural language prompt to a parameterized SQL query.
+
+    Returns (query, params, related_tables). Condition values are bound as
+    :p0, :p1, ... so prompts of the same shape produce identical SQL text
+    and reuse the connection's prepared statement. `table_matches` may be
+    passed in when tables were already matched (e.g. for a whole batch).
+    """
+    # Step 1: Extract conditions
+    conditions = parse_conditions(prompt)
+
+    # Step 2: Find the best matching table
+    if table_matches is None:
+        table_matches = find_matching_table(prompt)
     target_table = table_matches[0][0] if table_matches else None
     
     if not target_table:
         raise ValueError("No matching table found for prompt")
     
-    # Step 2: Extract conditions
-    conditions = parse_conditions(prompt)
+    # Embed, in one call, only the condition phrases that don't name a column outright
+    prompt_embeddings.get_many(condition_phrases_to_embed(conditions, target_table))
     condition_tables = set()
+    planner = join_planner.get()
     
-    # Step 3: Find columns for conditions
+    # Step 3: Find columns for conditions among the tables joinable to the target
+    reachable = sorted(planner.reachable(target_table))
     for cond in conditions:
-        col_matches = find_matching_column(cond["column"], table=target_table)
+        col_matches = find_matching_column(cond["column"], table=reachable)
         if col_matches:
             best_col = col_matches[0][2]
             cond["resolved_table"] = best_col["table"]
             cond["resolved_column"] = best_col["column"]
             condition_tables.add(best_col["table"])
     
-    # Step 4: Find all related tables
-    related_tables = find_related_tables(target_table, list(condition_tables))
+    # Step 4: Plan joins connecting the target to the condition tables only
+    joins = planner.plan(target_table, condition_tables)
+    related_tables = [target_table] + [table for table, _, _ in joins]
     
     # Step 5: Build SELECT clause
     select_columns = []
@@ -309,39 +568,24 @@ def generate_query_from_prompt(prompt):
         for col in SCHEMA_METADATA[table]["columns"]:
             select_columns.append(f"{table}.{col} AS '{table}_{col}'")
     
-    # Step 6: Build FROM and JOIN clauses
+    # Step 6: Build FROM and JOIN clauses from the exact FK column pairs
     from_clause = target_table
     join_clauses = []
+    for table, joined_to, pairs in joins:
+        on = " AND ".join(f"{joined_to}.{left} = {table}.{right}" for left, right in pairs)
+        join_clauses.append(f"JOIN {table} ON {on}")
     
-    # Build joins based on relationships
-    for table in related_tables:
-        if table == target_table:
-            continue
-            
-        # Find relationship path
-        if table in SCHEMA_METADATA[target_table]["relationships"]:
-            # Direct relationship
-            join_clauses.append(
-                f"JOIN {table} ON {target_table}.{table}_id = {table}.{table}_id"
-            )
-        else:
-            # Indirect relationship - find common relationships
-            for rel in SCHEMA_METADATA[target_table]["relationships"]:
-                if table in SCHEMA_METADATA[rel]["relationships"]:
-                    join_clauses.append(
-                        f"JOIN {rel} ON {target_table}.{rel}_id = {rel}.{rel}_id"
-                    )
-                    join_clauses.append(
-                        f"JOIN {table} ON {rel}.{table}_id = {table}.{table}_id"
-                    )
-                    break
-    
-    # Step 7: Build WHERE clause
+    # Step 7: Build WHERE clause with bind parameters (identifiers come from the schema, never the prompt)
     where_clauses = []
+    params = {}
     for cond in conditions:
         if "resolved_table" in cond and "resolved_column" in cond:
+            if cond["operator"] not in SQL_OPERATORS:
+                raise ValueError(f"Unsupported operator: {cond['operator']}")
+            name = f"p{len(params)}"
+            params[name] = cond["value"]
             where_clauses.append(
-                f"{cond['resolved_table']}.{cond['resolved_column']} {cond['operator']} '{cond['value']}'"
+                f"{cond['resolved_table']}.{cond['resolved_column']} {cond['operator']} :{name}"
             )
     
     # Step 8: Construct full query
@@ -351,28 +595,199 @@ def generate_query_from_prompt(prompt):
     if where_clauses:
         query += " WHERE " + " AND ".join(where_clauses)
     
-    return query, related_tables
+    return query, params, related_tables
+
+# Fetch only the reference rows the result actually points at
+_primary_keys = {}
+
+def primary_key(conn, table):
+    """Primary key column names of `table`, in key order"""
+    if table not in _primary_keys:
+        info = conn.execute(f"PRAGMA table_info({table})").fetchall()
+        _primary_keys[table] = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return _primary_keys[table]
+
+_column_dtypes = {}
+
+def result_dtypes(conn, tables):
+    """dtypes of the `{table}_{column}` result aliases, from the declared column types"""
+    dtypes = {}
+    for table in tables:
+        if table not in _column_dtypes:
+            _column_dtypes[table] = sqlite_column_dtypes(conn, table, prefix=f"{table}_")
+        dtypes.update(_column_dtypes[table])
+    return dtypes
+
+def _row_bytes(row):
+    """Approximate bytes on the wire for one row"""
+    return sum(
+        0 if value is None else len(value.encode("utf-8")) if isinstance(value, str)
+        else len(value) if isinstance(value, bytes) else 8
+        for value in row
+    )
+
+def keys_per_query(pk):
+    """Keys per IN list: a composite key binds one variable per column"""
+    return REFERENCE_BIND_LIMIT // len(pk)
+
+def fetch_reference_rows(conn, table, pk, keys):
+    """Yield lists of rows of `table` whose primary key is in `keys`, chunk by chunk"""
+    chunk_size = keys_per_query(pk)
+    for start in range(0, len(keys), chunk_size):
+        batch = keys[start:start + chunk_size]
+        if len(pk) == 1:
+            sql = f"SELECT * FROM {table} WHERE {pk[0]} IN ({', '.join('?' * len(batch))})"
+            params = [key[0] for key in batch]
+        else:
+            row_value = f"({', '.join('?' * len(pk))})"
+            sql = f"SELECT * FROM {table} WHERE ({', '.join(pk)}) IN (VALUES {', '.join([row_value] * len(batch))})"
+            params = [value for key in batch for value in key]
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(REFERENCE_FETCH_ROWS)
+            if not rows:
+                break
+            yield cur.description, rows
+
+def fetch_reference_data(conn, result_df, tables):
+    """Reference rows per table, restricted to keys present in the result.
+
+    The result aliases columns as `{table}_{column}`, so each table's key
+    values are read from its primary key columns there. Tables whose key
+    isn't in the result get an empty frame. Returns (data, transfer stats).
+    """
+    reference_data, stats = {}, {}
+    for table in tables:
+        pk = primary_key(conn, table)
+        key_columns = [f"{table}_{col}" for col in pk]
+        table_stats = {"keys": 0, "rows": 0, "bytes": 0, "queries": 0}
+        columns, rows = list(SCHEMA_METADATA[table]["columns"]), []
+        if pk and all(col in result_df.columns for col in key_columns):
+            keys = list(result_df[key_columns].dropna().drop_duplicates().itertuples(index=False, name=None))
+            table_stats["keys"] = len(keys)
+            table_stats["queries"] = -(-len(keys) // keys_per_query(pk))
+            for description, chunk in fetch_reference_rows(conn, table, pk, keys):
+                columns = [d[0] for d in description]
+                rows.extend(chunk)
+                table_stats["rows"] += len(chunk)
+                table_stats["bytes"] += sum(_row_bytes(row) for row in chunk)
+        reference_data[table] = pd.DataFrame.from_records(rows, columns=columns)
+        stats[table] = table_stats
+    stats["total"] = {
+        key: sum(s[key] for s in stats.values()) for key in ("keys", "rows", "bytes", "queries")
+    }
+    return reference_data, stats
+
+# Cache generated SQL per prompt and query results per (SQL, params, data version)
+_query_plans = OrderedDict()
+_query_plans_lock = threading.Lock()
+result_cache = ResultCache(max_bytes=RESULT_CACHE_BYTES)
+
+def cached_plan(prompt):
+    """(query, params, related_tables) if this prompt was planned before, else None"""
+    with _query_plans_lock:
+        plan = _query_plans.get(prompt)
+        if plan is None:
+            return None
+        _query_plans.move_to_end(prompt)
+    query, params, related_tables = plan
+    return query, dict(params), list(related_tables)
+
+def plan_query(prompt, table_matches=None):
+    """generate_query_from_prompt, memoized per exact prompt.
+
+    Not normalized: the bound condition values come from the prompt text,
+    so "code is us" and "code is US" must not share a plan.
+    """
+    plan = cached_plan(prompt)
+    if plan is not None:
+        return plan
+    plan = generate_query_from_prompt(prompt, table_matches)
+    with _query_plans_lock:
+        _query_plans[prompt] = plan
+        while len(_query_plans) > QUERY_PLAN_CACHE_SIZE:
+            _query_plans.popitem(last=False)
+    query, params, related_tables = plan
+    return query, dict(params), list(related_tables)
+
+def _no_transfer():
+    return {"total": {"keys": 0, "rows": 0, "bytes": 0, "queries": 0}}
 
 # Process user prompt
-def process_prompt(prompt):
+def process_prompt(prompt, table_matches=None):
     """Main function to process user prompt and return data"""
     # Generate SQL query
-    query, related_tables = generate_query_from_prompt(prompt)
-    
-    # Execute query
-    result_df = pd.read_sql_query(query, conn)
+    query, params, related_tables = plan_query(prompt, table_matches)
     
-    # Get reference data for all related tables
-    reference_data = {}
-    for table in related_tables:
-        reference_data[table] = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+    # Serve from cache when no table this query reads has changed since
+    conn = get_connection()
+    key = cache_key(query, params, table_versions(conn, related_tables))
+    cached = result_cache.get(key)
+    if cached is not None:
+        result_df = cached["result"].to_frame()
+        reference_data = {table: frame.to_frame() for table, frame in cached["reference_tables"].items()}
+        reference_stats = _no_transfer()
+    else:
+        # Execute query
+        result_df = read_sql_columnar(conn, query, params, dtypes=result_dtypes(conn, related_tables))
+        
+        # Get reference data for the rows the result references
+        reference_data, reference_stats = fetch_reference_data(conn, result_df, related_tables)
+        entry = {
+            "result": ColumnarFrame(result_df),
+            "reference_tables": {table: ColumnarFrame(df) for table, df in reference_data.items()}
+        }
+        nbytes = entry["result"].nbytes + sum(f.nbytes for f in entry["reference_tables"].values())
+        result_cache.put(key, entry, nbytes)
     
     return {
         "query": query,
+        "params": params,
         "result": result_df,
-        "reference_tables": reference_data
+        "reference_tables": reference_data,
+        "reference_transfer": reference_stats,
+        "cache_hit": cached is not None,
+        "result_cache": result_cache.info(),
+        "embedding_cache": prompt_embeddings.info(),
+        "lexical": dict(LEXICAL_METRICS)
     }
 
+# Process many prompts together (used by the micro-batching service)
+_sql_pool = ThreadPoolExecutor(max_workers=SQL_WORKERS, thread_name_prefix="embading_deep-sql")
+
+def submit_prompts_batch(prompts):
+    """process_prompt for a batch: shared embedding calls and matrix products, SQL in parallel.
+
+    Prompts planned before skip matching entirely. The rest are matched
+    together, then every condition phrase still needing an embedding is
+    embedded in one more call. Each prompt's SQL is then submitted to a pool
+    thread with its own connection; returns one Future per prompt, in order,
+    without waiting for any SQL to finish.
+    """
+    prompts = list(prompts)
+    new = [p for p in dict.fromkeys(prompts) if cached_plan(p) is None]
+    matches = {}
+    if new:
+        for prompt, table_matches in zip(new, find_matching_tables_batch(new)):
+            matches[prompt] = table_matches
+        phrases = [
+            phrase
+            for prompt in new if matches[prompt]
+            for phrase in condition_phrases_to_embed(parse_conditions(prompt), matches[prompt][0][0])
+        ]
+        prompt_embeddings.get_many(phrases)
+    return [_sql_pool.submit(process_prompt, p, matches.get(p)) for p in prompts]
+
+def process_prompts_batch(prompts):
+    """submit_prompts_batch, waiting for every prompt: one result or exception per prompt, in order"""
+    results = []
+    for future in submit_prompts_batch(prompts):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            results.append(e)
+    return results
+
 # Example usage
 if __name__ == "__main__":
     # Example prompts
@@ -390,11 +805,13 @@ if __name__ == "__main__":
             result = process_prompt(prompt)
             print("\nGenerated SQL Query:")
             print(result["query"])
+            print(f"Parameters: {result['params']}")
             
             print("\nResult Data:")
             print(result["result"])
             
-            print("\nReference Tables:")
+            transfer = result["reference_transfer"]["total"]
+            print(f"\nReference Tables ({transfer['rows']} rows, {transfer['bytes']} bytes fetched):")
             for table, data in result["reference_tables"].items():
                 print(f"\n{table.upper()} table (first 3 rows):")
                 print(data.head(3))
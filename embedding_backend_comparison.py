@@ -0,0 +1,76 @@
+# embedding_backend_comparison.py
+# Latency / accuracy of the local hashed n-gram backend vs. the remote OpenAI model
+# on the schema descriptions from embading_deep.SCHEMA_METADATA.
+
+import os
+import time
+import numpy as np
+
+from embading_deep import SCHEMA_METADATA, schema_items
+from embedding_backends import HashingNgramBackend, OpenAIEmbeddingBackend
+from vector_index import VectorIndex
+
+# Prompt -> (expected table, expected column)
+LABELLED_PROMPTS = [
+    ("participants older than 30", "participant", "participant.age"),
+    ("which country has the largest population", "country", "country.population"),
+    ("activities by difficulty level", "activity", "activity.difficulty"),
+    ("climate of each geographical area", "area", "area.climate"),
+    ("country code abbreviation", "country", "country.code"),
+    ("experience level of people joining activities", "participant", "participant.experience_level"),
+    ("sports and cultural activities", "activity", "activity.type"),
+    ("areas within countries", "area", "area.country_id"),
+    ("full name of each participant", "participant", "participant.name"),
+    ("name of the activity", "activity", "activity.name"),
+]
+
+def evaluate(backend):
+    items = schema_items(SCHEMA_METADATA)
+    start = time.perf_counter()
+    vectors = backend.embed([text for _, _, text, _ in items])
+    build_s = time.perf_counter() - start
+
+    kinds = np.array([kind for kind, _, _, _ in items])
+    keys = [key for _, key, _, _ in items]
+    tables = VectorIndex([k for k, kind in zip(keys, kinds) if kind == "tables"], vectors[kinds == "tables"])
+    columns = VectorIndex([k for k, kind in zip(keys, kinds) if kind == "columns"], vectors[kinds == "columns"])
+
+    latencies, table_hits, column_hits, answers = [], 0, 0, []
+    for prompt, expected_table, expected_column in LABELLED_PROMPTS:
+        start = time.perf_counter()
+        query = backend.embed([prompt])[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        best_table = tables.search(query, top_k=1)[0][0]
+        best_column = columns.search(query, top_k=1)[0][0]
+        table_hits += best_table == expected_table
+        column_hits += best_column == expected_column
+        answers.append((best_table, best_column))
+
+    return {
+        "backend": backend.name,
+        "index_build_ms": round(build_s * 1000, 1),
+        "prompt_ms_mean": round(float(np.mean(latencies)), 2),
+        "prompt_ms_p95": round(float(np.percentile(latencies, 95)), 2),
+        "table_top1": table_hits / len(LABELLED_PROMPTS),
+        "column_top1": column_hits / len(LABELLED_PROMPTS),
+        "answers": answers,
+    }
+
+if __name__ == "__main__":
+    corpus = [text for _, _, text, _ in schema_items(SCHEMA_METADATA)]
+    results = [evaluate(HashingNgramBackend().fit(corpus))]
+    if os.getenv("OPENAI_API_KEY"):
+        results.append(evaluate(OpenAIEmbeddingBackend(model="text-embedding-3-small")))
+    else:
+        print("OPENAI_API_KEY not set: skipping the remote backend\n")
+
+    for r in results:
+        print(f"{r['backend']}")
+        print(f"  index build: {r['index_build_ms']} ms")
+        print(f"  per prompt:  {r['prompt_ms_mean']} ms mean, {r['prompt_ms_p95']} ms p95")
+        print(f"  top-1 table accuracy:  {r['table_top1']:.0%}")
+        print(f"  top-1 column accuracy: {r['column_top1']:.0%}")
+
+    if len(results) == 2:
+        agree = np.mean([a == b for a, b in zip(results[0]["answers"], results[1]["answers"])])
+        print(f"\nLocal/remote agreement on (table, column): {agree:.0%}")
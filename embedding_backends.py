@@ -0,0 +1,122 @@
+import hashlib
+import os
+import re
+import time
+import zlib
+
+import numpy as np
+
+from embedding_cache import normalize_text
+from llm_usage import record_openai_response
+
+
+class EmbeddingBackend:
+    """Turns a list of texts into an (n, dim) float32 matrix.
+
+    `name` identifies the vector space; vectors from different names must
+    never be compared, so it is also the key used by the store and caches.
+    """
+
+    name = "base"
+    remote = False
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+    def fit(self, corpus):
+        """Backends that learn from the schema descriptions override this"""
+        return self
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """OpenAI / Azure OpenAI embeddings API (pass an AzureOpenAI client for Azure)"""
+
+    remote = True
+
+    def __init__(self, client=None, model="text-embedding-3-small", call_site="embeddings"):
+        self._client = client
+        self.model = model
+        self.name = model
+        self.call_site = call_site
+
+    @property
+    def client(self):
+        # Created on first use so importing a module that picks this backend stays cheap
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    def embed(self, texts):
+        start = time.perf_counter()
+        response = self.client.embeddings.create(input=list(texts), model=self.model)
+        record_openai_response(self.call_site, response, time.perf_counter() - start,
+                               model=self.model, embedding=True)
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.asarray([item.embedding for item in data], dtype=np.float32)
+
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+
+
+class HashingNgramBackend(EmbeddingBackend):
+    """Local, dependency-free embeddings: hashed character n-gram TF-IDF.
+
+    Identifiers are split on underscores/punctuation first, so `area_id`
+    and "area id" land on the same n-grams. fit() learns IDF weights from
+    the schema descriptions; without it every n-gram weighs the same.
+    """
+
+    def __init__(self, dim=4096, ngram_range=(3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.idf = np.ones(dim, dtype=np.float32)
+        self._corpus_digest = "none"
+
+    @property
+    def name(self):
+        low, high = self.ngram_range
+        return f"hashing-ngram-{low}-{high}-{self.dim}-{self._corpus_digest}"
+
+    def _buckets(self, text):
+        words = " ".join(w for w in _TOKEN_SPLIT.split(normalize_text(text)) if w)
+        padded = f" {words} "
+        low, high = self.ngram_range
+        return [
+            zlib.crc32(padded[i:i + n].encode("utf-8")) % self.dim
+            for n in range(low, high + 1)
+            for i in range(len(padded) - n + 1)
+        ]
+
+    def fit(self, corpus):
+        corpus = list(corpus)
+        doc_freq = np.zeros(self.dim, dtype=np.float32)
+        for text in corpus:
+            doc_freq[np.unique(self._buckets(text))] += 1
+        self.idf = np.log((1 + len(corpus)) / (1 + doc_freq)).astype(np.float32) + 1.0
+        self._corpus_digest = hashlib.sha256("\n".join(corpus).encode("utf-8")).hexdigest()[:12]
+        return self
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            buckets, counts = np.unique(self._buckets(text), return_counts=True)
+            matrix[row, buckets] = (1 + np.log(counts)) * self.idf[buckets]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+def get_backend(kind=None, corpus=None, model="text-embedding-3-small", call_site="embeddings"):
+    """Backend selected per deployment with EMBEDDING_BACKEND=openai|local.
+
+    `corpus` (the schema descriptions) is used to fit the local backend.
+    """
+    kind = (kind or os.getenv("EMBEDDING_BACKEND", "openai")).lower()
+    if kind == "local":
+        backend = HashingNgramBackend()
+        return backend.fit(corpus) if corpus else backend
+    if kind == "openai":
+        return OpenAIEmbeddingBackend(model=model, call_site=call_site)
+    raise ValueError(f"Unknown embedding backend: {kind}")
+
@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace and case so trivially different prompts share an entry"""
+    return " ".join(text.split()).casefold()
+
+
+class EmbeddingCache:
+    """Bounded LRU in front of an embedding function.
+
+    `embed_batch_fn(list_of_texts)` is only called for texts that miss, once
+    per get_many() call, with duplicates removed.
+    """
+
+    def __init__(self, embed_batch_fn, model, maxsize=4096):
+        self.embed_batch_fn = embed_batch_fn
+        self.model = model
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        keys = [(self.model, normalize_text(t)) for t in texts]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in found:
+                    continue
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+                    self.hits += 1
+            missing = list(dict.fromkeys(k for k in keys if k not in found))
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self.embed_batch_fn([text for _, text in missing])
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return [found[key] for key in keys]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", ".embedding_store")
+
+
+def text_key(model, text):
+    return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
+class EmbeddingStore:
+    """Persistent embedding matrix shared between processes.
+
+    Vectors live in `vectors.npy`, opened read-only with np.memmap so every
+    worker maps the same pages, and `index.json` maps (model, sha256(text))
+    to a row. Only texts that aren't in the store yet are sent to the API.
+    """
+
+    def __init__(self, path, dtype="float32"):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.vectors_path = os.path.join(path, "vectors.npy")
+        self.index_path = os.path.join(path, "index.json")
+        self.lock_path = os.path.join(path, ".lock")
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._rows = 0
+        self._matrix = None
+        self._index_mtime = None
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(path, exist_ok=True)
+
+    # --- Loading ---
+    def _reload_if_changed(self):
+        if not os.path.exists(self.index_path):
+            return
+        mtime = os.stat(self.index_path).st_mtime_ns
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path, "r") as f:
+            meta = json.load(f)
+        self._keys = meta["keys"]
+        self._rows = meta["rows"]
+        self._matrix = np.load(self.vectors_path, mmap_mode="r")
+        self._index_mtime = mtime
+
+    def __len__(self):
+        self._reload_if_changed()
+        return self._rows
+
+    def lookup(self, model, texts):
+        """Rows for each text, or None where the text hasn't been embedded"""
+        with self._lock:
+            self._reload_if_changed()
+            return [self._keys.get(text_key(model, text)) for text in texts]
+
+    # --- Writing ---
+    def _file_lock(self):
+        handle = open(self.lock_path, "a+")
+        if fcntl is not None:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+        return handle
+
+    def _write_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"rows": self._rows, "dim": self._matrix.shape[1], "keys": self._keys}, f)
+        os.replace(tmp, self.index_path)
+
+    def _writable_matrix(self, needed, dim):
+        """Open the matrix for writing, growing the file when it's out of capacity"""
+        if self._matrix is not None and self._matrix.shape[1] != dim:
+            raise ValueError(f"Store {self.path} holds {self._matrix.shape[1]}-d vectors, got {dim}-d")
+        capacity = self._matrix.shape[0] if self._matrix is not None else 0
+        if needed <= capacity:
+            return np.lib.format.open_memmap(self.vectors_path, mode="r+")
+
+        new_capacity = max(needed, 2 * capacity, 1024)
+        tmp = self.vectors_path + ".tmp"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=self.dtype, shape=(new_capacity, dim))
+        if self._rows:
+            grown[:self._rows] = self._matrix[:self._rows]
+        grown.flush()
+        del grown
+        os.replace(tmp, self.vectors_path)
+        return np.lib.format.open_memmap(self.vectors_path, mode="r+")
+
+    def put(self, model, texts, vectors):
+        vectors = np.asarray(vectors, dtype=self.dtype)
+        with self._lock:
+            handle = self._file_lock()
+            try:
+                self._index_mtime = None
+                self._reload_if_changed()
+                keys = [text_key(model, t) for t in texts]
+                new = [(k, v) for k, v in zip(keys, vectors) if k not in self._keys]
+                if not new:
+                    return
+                matrix = self._writable_matrix(self._rows + len(new), vectors.shape[1])
+                for key, vector in new:
+                    matrix[self._rows] = vector
+                    self._keys[key] = self._rows
+                    self._rows += 1
+                matrix.flush()
+                del matrix
+                self._matrix = np.load(self.vectors_path, mmap_mode="r")
+                self._write_index()
+                self._index_mtime = os.stat(self.index_path).st_mtime_ns
+            finally:
+                handle.close()
+
+    # --- Main entry point ---
+    def embed(self, model, texts, embed_fn):
+        """Vectors for `texts`, calling embed_fn(list_of_texts) only for unseen ones"""
+        texts = list(texts)
+        rows = self.lookup(model, texts)
+        missing = list(dict.fromkeys(t for t, r in zip(texts, rows) if r is None))
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if missing:
+            self.put(model, missing, embed_fn(missing))
+            rows = self.lookup(model, texts)
+        if not texts:
+            return np.empty((0, 0), dtype=self.dtype)
+        return np.asarray(self._matrix[np.asarray(rows)])
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(model):
+    """One store per model, since dimensions differ between models"""
+    with _stores_lock:
+        if model not in _stores:
+            _stores[model] = EmbeddingStore(os.path.join(EMBEDDING_STORE_DIR, model))
+        return _stores[model]
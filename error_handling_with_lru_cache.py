@@ -10,14 +10,16 @@ from langchain_openai import AzureChatOpenAI
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import AgentExecutor, create_openai_tools_agent
+from sql_guard import QueryGuard, guard_tools, guard_metrics
+from executor_registry import EXECUTOR_REGISTRY, executor_fingerprint, llm_config
+from llm_usage import USAGE, UsageCallbackHandler, usage_scope
 
 # ---------------------------
 # GLOBAL CONFIG & CACHE INIT
 # ---------------------------
 logging.basicConfig(level=logging.INFO, format='%(levelname)s: %(message)s')
 
-# Shared in-memory caches
-EXECUTOR_CACHE = LRUCache(maxsize=8)     # prompt -> AgentExecutor
+# Shared in-memory caches (executors live in the shared EXECUTOR_REGISTRY)
 QUERY_CACHE = LRUCache(maxsize=128)      # (conn_str, query, prompt, top_k) -> output
 
 # Azure OpenAI config (shared)
@@ -47,11 +49,20 @@ class QueryRequest(BaseModel):
 # CORE AGENT CLASS
 # ----------------------
 class LangChainSQLAgent:
-    def __init__(self, conn_str: str, azure_config: dict, executor_cache=None, query_cache=None):
+    # AgentExecutor settings; part of the executor registry key
+    EXECUTOR_OPTIONS = {
+        "verbose": False,
+        "handle_parsing_errors": True,
+        "early_stopping_method": "generate",
+        "return_intermediate_steps": False,
+        "max_execution_time": 30
+    }
+
+    def __init__(self, conn_str: str, azure_config: dict, executor_registry=None, query_cache=None):
         self.conn_str = conn_str
         self.azure_config = azure_config['azure_config']
 
-        self._executor_cache = executor_cache or LRUCache(maxsize=8)
+        self._executor_registry = executor_registry or EXECUTOR_REGISTRY
         self._query_cache = query_cache or LRUCache(maxsize=128)
 
         self.db = None
@@ -83,7 +94,9 @@ class LangChainSQLAgent:
 
     def _setup_tools(self):
         toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-        self.tools = toolkit.get_tools()
+        # Every agent query is EXPLAINed and cost-checked before it hits the DB
+        self.guard = QueryGuard(self.db._engine, timeout_s=30, row_cap=1000)
+        self.tools = guard_tools(toolkit.get_tools(), self.guard)
 
     def _get_cache_key(self, query: str, prompt: str, top_k: int) -> tuple:
         return (
@@ -103,11 +116,11 @@ class LangChainSQLAgent:
 
     def create_executor(self, prompt: str) -> AgentExecutor:
         norm_prompt = prompt.strip()
+        key = executor_fingerprint(norm_prompt, llm_config(self.llm), self.tools, scope=self.conn_str.strip(),
+                                   executor_options=self.EXECUTOR_OPTIONS)
+        return self._executor_registry.get_or_create(key, lambda: self._build_executor(norm_prompt))
 
-        if norm_prompt in self._executor_cache:
-            logging.info("♻️ Reusing cached executor")
-            return self._executor_cache[norm_prompt]
-
+    def _build_executor(self, norm_prompt: str) -> AgentExecutor:
         logging.info("🧠 Creating new executor")
         template = ChatPromptTemplate.from_messages([
             ("system", norm_prompt),
@@ -121,18 +134,7 @@ class LangChainSQLAgent:
             prompt=template
         )
 
-        executor = AgentExecutor(
-            agent=agent,
-            tools=self.tools,
-            verbose=False,
-            handle_parsing_errors=True,
-            early_stopping_method="generate",
-            return_intermediate_steps=False,
-            max_execution_time=30
-        )
-
-        self._executor_cache[norm_prompt] = executor
-        return executor
+        return AgentExecutor(agent=agent, tools=self.tools, **self.EXECUTOR_OPTIONS)
 
     def run_query(self, query: str, system_prompt: str, top_k: int = 5) -> str:
         cache_key = self._get_cache_key(query, system_prompt, top_k)
@@ -146,7 +148,8 @@ class LangChainSQLAgent:
             executor = self.create_executor(system_prompt)
             inputs = self.prepare_inputs(query, top_k)
             start = time.perf_counter()
-            result = executor.invoke(inputs)
+            usage = UsageCallbackHandler("LangChainSQLAgent.run_query", schema=self.conn_str)
+            result = executor.invoke(inputs, config={"callbacks": [usage]})
             elapsed = time.perf_counter() - start
             logging.info(f"⏱️ Query executed in {elapsed:.2f}s")
 
@@ -165,7 +168,7 @@ app = FastAPI()
 
 @app.on_event("startup")
 def clear_all_caches():
-    EXECUTOR_CACHE.clear()
+    EXECUTOR_REGISTRY.clear()
     QUERY_CACHE.clear()
     logging.info("🔄 All caches cleared on startup")
 
@@ -175,15 +178,23 @@ def run_sql_agent(request: QueryRequest):
     agent = LangChainSQLAgent(
         conn_str=conn_str,
         azure_config=AZURE_CONFIG,
-        executor_cache=EXECUTOR_CACHE,
         query_cache=QUERY_CACHE
     )
 
+    with usage_scope(schema=conn_str) as usage:
+        result = agent.run_query(request.query, request.prompt, request.top_k)
+
     return {
-        "result": agent.run_query(request.query, request.prompt, request.top_k),
+        "result": result,
+        "usage": usage.summary(),
         "cache_info": {
-            "executor_cache_size": len(EXECUTOR_CACHE),
+            "executor_registry": EXECUTOR_REGISTRY.info(),
             "query_cache_size": len(QUERY_CACHE)
-        }
+        },
+        "guard_metrics": guard_metrics()
     }
 
+@app.get("/usage")
+def get_llm_usage():
+    """Token, latency and cost totals per call site / schema / model, most expensive first"""
+    return {"usage": USAGE.summary()}
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+
+
+def _tool_signature(tool):
+    return {
+        "name": tool.name,
+        "description": tool.description,
+        "args": getattr(tool, "args", {}),
+    }
+
+
+def llm_config(llm) -> dict:
+    """The LLM's actual settings, read from the model object itself.
+
+    Only JSON-serializable fields are kept, which leaves out clients,
+    callbacks and SecretStr keys.
+    """
+    fields = llm.model_dump() if hasattr(llm, "model_dump") else dict(vars(llm))
+    config = {}
+    for name, value in fields.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        config[name] = value
+    return config
+
+
+def executor_fingerprint(system_prompt: str, model_config: dict, tools, scope: str = "",
+                         executor_options: dict = None) -> str:
+    """Stable content hash of everything an AgentExecutor is built from.
+
+    `scope` identifies what the tools are bound to (e.g. the connection string),
+    since the SQL toolkit tools have the same names and schemas for every database.
+    `executor_options` are the AgentExecutor keyword arguments (timeouts, early stopping, ...).
+    """
+    payload = {
+        "system_prompt": system_prompt.strip(),
+        "model_config": model_config,
+        "executor_options": executor_options or {},
+        "tools": sorted((_tool_signature(t) for t in tools), key=lambda t: t["name"]),
+        "scope": scope,
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ExecutorRegistry:
+    """Bounded, thread-safe executor cache keyed by content fingerprint.
+
+    The newest `maxsize` executors are held strongly. Evicted ones stay reachable
+    through a weak map for as long as some agent still references them, and are
+    freed as soon as nobody does.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._strong = OrderedDict()
+        self._weak = weakref.WeakValueDictionary()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _promote(self, key, executor):
+        self._strong[key] = executor
+        self._strong.move_to_end(key)
+        while len(self._strong) > self.maxsize:
+            self._strong.popitem(last=False)
+
+    def get_or_create(self, key: str, factory):
+        with self._lock:
+            executor = self._strong.get(key)
+            if executor is None:
+                executor = self._weak.get(key)
+            if executor is not None:
+                self.hits += 1
+                self._promote(key, executor)
+                return executor
+            self.misses += 1
+
+        executor = factory()
+        with self._lock:
+            # Another thread may have built the same executor meanwhile; keep the first one
+            existing = self._weak.get(key)
+            if existing is not None:
+                executor = existing
+            else:
+                self._weak[key] = executor
+            self._promote(key, executor)
+        logging.info(f"🧠 Registered executor {key[:12]} ({len(self._strong)} cached)")
+        return executor
+
+    def clear(self):
+        with self._lock:
+            self._strong.clear()
+            self._weak.clear()
+
+    def info(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._strong),
+                "alive": len(self._weak),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self):
+        return len(self._strong)
+
+
+# Shared by every LangChainSQLAgent variant
+EXECUTOR_REGISTRY = ExecutorRegistry(maxsize=32)
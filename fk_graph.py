@@ -0,0 +1,216 @@
+import weakref
+from graphlib import TopologicalSorter
+from typing import Dict, List
+
+from sqlalchemy import inspect
+
+
+class FKDependencyResolver:
+    """Deterministic table dependencies from declared foreign keys.
+
+    A parent is *required* when every column of the FK pointing at it is
+    NOT NULL, i.e. a child row cannot exist before the parent row does.
+    Pass include_nullable=True to treat optional FKs as dependencies too.
+    """
+
+    def __init__(self, engine, schema=None, include_nullable=False):
+        self.engine = engine
+        self.schema = schema
+        self.include_nullable = include_nullable
+        self._parents = None      # table -> {parent: required}
+        self._closure = {}        # table -> transitive parents, parents first
+
+    def _load(self):
+        inspector = inspect(self.engine)
+        parents = {}
+        for table in inspector.get_table_names(schema=self.schema):
+            nullable = {c["name"]: c.get("nullable", True) for c in inspector.get_columns(table, schema=self.schema)}
+            parents[table] = {}
+            for fk in inspector.get_foreign_keys(table, schema=self.schema):
+                parent = fk["referred_table"]
+                if parent == table:
+                    continue  # self references never block generation
+                required = all(not nullable.get(col, True) for col in fk["constrained_columns"])
+                parents[table][parent] = parents[table].get(parent, False) or required
+        self._parents = parents
+
+    @property
+    def parents(self) -> Dict[str, Dict[str, bool]]:
+        if self._parents is None:
+            self._load()
+        return self._parents
+
+    @property
+    def tables(self) -> List[str]:
+        return list(self.parents)
+
+    def refresh(self):
+        """Drop cached catalog info, e.g. after DDL changes"""
+        self._parents = None
+        self._closure.clear()
+
+    def direct_parents(self, table: str) -> List[str]:
+        if table not in self.parents:
+            raise ValueError(f"Unknown table: {table}")
+        return sorted(p for p, required in self.parents[table].items()
+                      if required or self.include_nullable)
+
+    def transitive_parents(self, table: str) -> List[str]:
+        """All tables that must be populated before `table`, in generation order"""
+        if table not in self._closure:
+            graph = {}
+            stack = [table]
+            while stack:
+                current = stack.pop()
+                if current in graph:
+                    continue
+                graph[current] = self.direct_parents(current) if current in self.parents else []
+                stack.extend(graph[current])
+            # FK cycles can't be satisfied anyway; drop back edges so ordering still works
+            order = _static_order_ignoring_cycles(graph)
+            self._closure[table] = [t for t in order if t != table]
+        return list(self._closure[table])
+
+
+def _static_order_ignoring_cycles(graph):
+    acyclic = {}
+    state = {}
+
+    def visit(node):
+        state[node] = "visiting"
+        acyclic[node] = []
+        for parent in graph.get(node, []):
+            if state.get(parent) == "visiting":
+                continue
+            acyclic[node].append(parent)
+            if parent not in state:
+                visit(parent)
+        state[node] = "done"
+
+    for node in graph:
+        if node not in state:
+            visit(node)
+    return list(TopologicalSorter(acyclic).static_order())
+
+
+class FKClosureIndex:
+    """Transitive FK closure with one bitset (a Python int) per table.
+
+    Bit i of `ancestor_bits[t]` is set when table i is reachable from t by
+    following foreign keys (t references it, directly or not); descendants
+    are the reverse. Lookups are a list index plus a memoized decode, and
+    add() extends the closure for new tables/FKs without recomputing it.
+    """
+
+    def __init__(self, parents=None):
+        self.names = []            # bit -> table
+        self.ids = {}              # table -> bit
+        self.parent_ids = []       # bit -> set of direct parent bits
+        self.child_ids = []        # bit -> set of direct child bits
+        self.ancestor_bits = []
+        self.descendant_bits = []
+        self.version = 0
+        self._decoded = {}
+        if parents:
+            self.add(parents)
+
+    @classmethod
+    def from_metadata(cls, metadata):
+        return cls(_metadata_parents(metadata.tables.values()))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, table):
+        return table in self.ids
+
+    def _id(self, table):
+        if table not in self.ids:
+            self.ids[table] = len(self.names)
+            self.names.append(table)
+            self.parent_ids.append(set())
+            self.child_ids.append(set())
+            self.ancestor_bits.append(0)
+            self.descendant_bits.append(0)
+        return self.ids[table]
+
+    def add(self, parents):
+        """Add tables and FK edges: {table: [tables it references]}"""
+        edges = []
+        for table, refs in parents.items():
+            child = self._id(table)
+            for ref in refs:
+                parent = self._id(ref)
+                if parent != child and parent not in self.parent_ids[child]:
+                    self.parent_ids[child].add(parent)
+                    self.child_ids[parent].add(child)
+                    edges.append((child, parent))
+        # Push new reachability along existing edges until nothing changes (handles FK cycles)
+        up = [child for child, _ in edges]
+        while up:
+            node = up.pop()
+            bits = self.ancestor_bits[node]
+            for parent in self.parent_ids[node]:
+                bits |= (1 << parent) | self.ancestor_bits[parent]
+            bits &= ~(1 << node)
+            if bits != self.ancestor_bits[node]:
+                self.ancestor_bits[node] = bits
+                up.extend(self.child_ids[node])
+        down = [parent for _, parent in edges]
+        while down:
+            node = down.pop()
+            bits = self.descendant_bits[node]
+            for child in self.child_ids[node]:
+                bits |= (1 << child) | self.descendant_bits[child]
+            bits &= ~(1 << node)
+            if bits != self.descendant_bits[node]:
+                self.descendant_bits[node] = bits
+                down.extend(self.parent_ids[node])
+        self.version += 1
+        self._decoded.clear()
+
+    def _decode(self, kind, bits):
+        key = (kind, bits)
+        if key not in self._decoded:
+            names, i = [], 0
+            while bits:
+                if bits & 1:
+                    names.append(self.names[i])
+                bits >>= 1
+                i += 1
+            self._decoded[key] = frozenset(names)
+        return self._decoded[key]
+
+    def _bits(self, table, bitsets):
+        if table not in self.ids:
+            raise ValueError(f"Unknown table: {table}")
+        return bitsets[self.ids[table]]
+
+    def ancestors(self, table):
+        """Tables `table` references, directly or transitively (itself excluded)"""
+        return self._decode("ancestors", self._bits(table, self.ancestor_bits))
+
+    def descendants(self, table):
+        """Tables that reference `table`, directly or transitively (itself excluded)"""
+        return self._decode("descendants", self._bits(table, self.descendant_bits))
+
+    def references(self, table, other):
+        """True when `table` reaches `other` through foreign keys"""
+        return other in self.ids and bool(self._bits(table, self.ancestor_bits) >> self.ids[other] & 1)
+
+
+def _metadata_parents(tables):
+    return {table.name: [fk.column.table.name for fk in table.foreign_keys] for table in tables}
+
+
+_metadata_closures = weakref.WeakKeyDictionary()
+
+
+def closure_for_metadata(metadata):
+    """FKClosureIndex for a reflected MetaData, built once and extended when tables are reflected into it"""
+    closure = _metadata_closures.get(metadata)
+    if closure is None:
+        closure = _metadata_closures[metadata] = FKClosureIndex()
+    if len(closure) < len(metadata.tables):
+        closure.add(_metadata_parents(t for t in metadata.tables.values() if t.name not in closure))
+    return closure
@@ -0,0 +1,128 @@
+from collections import deque
+
+
+class JoinPlanner:
+    """Join paths between tables, precomputed from declared foreign keys.
+
+    Built once: a BFS from every table gives all-pairs shortest join paths
+    (FK hops, either direction) with the exact column pairs of each hop.
+    plan() connects a root table to the tables a query needs with the
+    shortest-path Steiner tree heuristic: repeatedly attach the needed table
+    closest to the tree along its shortest path. Plans are memoized, so
+    repeated shapes cost a dict lookup.
+    """
+
+    def __init__(self, foreign_keys):
+        """`foreign_keys`: [(child, [child columns], parent, [parent columns])]"""
+        self.neighbors = {}  # table -> {neighbor: [(table column, neighbor column)]}
+        for child, child_cols, parent, parent_cols in foreign_keys:
+            self.neighbors.setdefault(child, {})
+            self.neighbors.setdefault(parent, {})
+            if child == parent or parent in self.neighbors[child]:
+                continue  # self references and parallel FKs: keep the first declared
+            self.neighbors[child][parent] = list(zip(child_cols, parent_cols))
+            self.neighbors[parent][child] = list(zip(parent_cols, child_cols))
+        self._previous = {table: self._bfs(table) for table in self.neighbors}
+        self._plans = {}
+
+    @classmethod
+    def from_sqlite(cls, conn):
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+        )]
+        foreign_keys = [(table, [], table, []) for table in tables]  # register FK-less tables too
+        for table in tables:
+            grouped = {}
+            # PRAGMA foreign_key_list: (id, seq, parent table, from column, to column, ...)
+            for fk_id, _, parent, from_col, to_col, *_ in conn.execute(f"PRAGMA foreign_key_list({table})"):
+                grouped.setdefault(fk_id, (parent, [], []))
+                grouped[fk_id][1].append(from_col)
+                grouped[fk_id][2].append(to_col)
+            for fk_id in sorted(grouped):
+                parent, from_cols, to_cols = grouped[fk_id]
+                if None in to_cols:
+                    # `REFERENCES parent` without a column list means the parent's primary key
+                    to_cols = cls._sqlite_primary_key(conn, parent)
+                foreign_keys.append((table, from_cols, parent, to_cols))
+        return cls(foreign_keys)
+
+    @staticmethod
+    def _sqlite_primary_key(conn, table):
+        # PRAGMA table_info: (cid, name, type, notnull, default, pk position or 0)
+        pk = sorted((row[5], row[1]) for row in conn.execute(f"PRAGMA table_info({table})") if row[5])
+        return [name for _, name in pk] or ["rowid"]
+
+    @classmethod
+    def from_engine(cls, engine, schema=None):
+        from sqlalchemy import inspect
+
+        inspector = inspect(engine)
+        foreign_keys = []
+        for table in inspector.get_table_names(schema=schema):
+            foreign_keys.append((table, [], table, []))
+            for fk in inspector.get_foreign_keys(table, schema=schema):
+                foreign_keys.append((table, fk["constrained_columns"], fk["referred_table"], fk["referred_columns"]))
+        return cls(foreign_keys)
+
+    def _bfs(self, source):
+        previous = {source: None}
+        queue = deque([source])
+        while queue:
+            current = queue.popleft()
+            for neighbor in sorted(self.neighbors[current]):
+                if neighbor not in previous:
+                    previous[neighbor] = current
+                    queue.append(neighbor)
+        return previous
+
+    @property
+    def tables(self):
+        return list(self.neighbors)
+
+    def reachable(self, table):
+        """Tables that can be joined to `table`, itself included"""
+        self._check(table)
+        return set(self._previous[table])
+
+    def _check(self, table):
+        if table not in self.neighbors:
+            raise ValueError(f"Unknown table: {table}")
+
+    def path(self, source, target):
+        """Tables on a shortest join path, source first"""
+        self._check(source)
+        self._check(target)
+        previous = self._previous[source]
+        if target not in previous:
+            raise ValueError(f"No foreign key path from {source} to {target}")
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        return path[::-1]
+
+    def plan(self, root, tables):
+        """Joins connecting `root` to `tables`: [(table, joined_to, [(joined_to column, table column)])]
+
+        Each step joins one new table to a table already in the plan.
+        """
+        key = (root, frozenset(tables) - {root})
+        if key not in self._plans:
+            self._check(root)
+            tree = [root]
+            steps = []
+            remaining = set(key[1])
+            while remaining:
+                # Attach whichever needed table is fewest hops from the current tree
+                path = min((self._path_to_tree(t, tree) for t in sorted(remaining)), key=len)
+                # The path may cross the tree again; only the part after its last tree table is new
+                path = path[max(i for i, t in enumerate(path) if t in tree):]
+                for left, right in zip(path, path[1:]):
+                    steps.append((right, left, self.neighbors[left][right]))
+                    tree.append(right)
+                remaining -= set(tree)
+            self._plans[key] = steps
+        return list(self._plans[key])
+
+    def _path_to_tree(self, table, tree):
+        """Shortest path from some tree table to `table`, tree table first"""
+        return min((self.path(t, table) for t in tree), key=len)
@@ -0,0 +1,84 @@
+import logging
+import threading
+import time
+
+
+class LazyService:
+    """A value that is built once, on first use or by a background warm-up.
+
+    Callers that arrive while a build is running wait for it instead of
+    starting another one. `status()` reports readiness explicitly.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self._value = None
+        self._state = "cold"
+        self._error = None
+        self._build_seconds = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self._state == "ready"
+
+    def _build(self):
+        start = time.perf_counter()
+        try:
+            self._value = self.factory()
+            self._state = "ready"
+            logging.info(f"✅ {self.name} ready in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            self._error = e
+            self._state = "failed"
+            logging.error(f"❌ {self.name} failed to build: {e}")
+        finally:
+            self._build_seconds = round(time.perf_counter() - start, 3)
+            self._done.set()
+
+    def _start(self):
+        """Claim the build if nobody has; returns True for the caller that should run it"""
+        with self._lock:
+            if self._state in ("cold", "failed"):
+                self._state = "building"
+                self._error = None
+                self._done.clear()
+                return True
+            return False
+
+    def get(self, timeout=None):
+        if self._state != "ready":
+            if self._start():
+                self._build()
+            elif not self._done.wait(timeout):
+                raise TimeoutError(f"{self.name} is still building")
+            if self._state == "failed":
+                raise RuntimeError(f"{self.name} failed to build: {self._error}") from self._error
+        return self._value
+
+    def warm_up(self, background=True):
+        """Start building now; in a daemon thread unless background=False"""
+        if not self._start():
+            return None
+        if not background:
+            self._build()
+            return None
+        thread = threading.Thread(target=self._build, name=f"warm-up-{self.name}", daemon=True)
+        thread.start()
+        return thread
+
+    def reset(self):
+        with self._lock:
+            if self._state != "building":
+                self._value = None
+                self._state = "cold"
+
+    def status(self):
+        return {
+            "name": self.name,
+            "state": self._state,
+            "build_seconds": self._build_seconds,
+            "error": str(self._error) if self._error else None,
+        }
@@ -0,0 +1,141 @@
+import difflib
+import math
+import re
+from collections import Counter, defaultdict
+
+_TOKEN_SPLIT = re.compile(r"[^a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "by", "data", "for", "from", "generate", "get", "give",
+    "in", "is", "list", "me", "of", "on", "or", "show", "the", "to", "where", "with",
+}
+
+
+def stem(token):
+    """Plural folding only: `activities` -> `activity`, `participants` -> `participant`"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lower-cased, plural-folded tokens; identifiers split on `_` and punctuation"""
+    return [stem(t) for t in _TOKEN_SPLIT.split(text.lower()) if t and t not in STOPWORDS]
+
+
+def trigrams(token):
+    padded = f"^{token}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class LexicalIndex:
+    """Inverted index with BM25 ranking over schema names and descriptions.
+
+    Each document has a name (table or column identifier) and a description.
+    Name tokens are counted twice so a literal mention outranks a passing
+    reference in some other description. Query tokens that aren't in the
+    vocabulary are mapped to the closest indexed token (difflib ratio >=
+    `fuzzy_cutoff`), so small typos like "particpants" still hit. Only the
+    `fuzzy_candidates` tokens sharing the most trigrams with it are compared,
+    and corrections are memoized until the vocabulary changes.
+    """
+
+    def __init__(self, k1=1.2, b=0.75, fuzzy_cutoff=0.85, fuzzy_candidates=32):
+        self.k1 = k1
+        self.b = b
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.fuzzy_candidates = fuzzy_candidates
+        self.postings = defaultdict(dict)  # token -> {key: term frequency}
+        self.trigram_postings = defaultdict(set)  # trigram -> tokens containing it
+        self._corrections = {}             # out-of-vocabulary token -> indexed token
+        self.names = {}                    # key -> set of name tokens
+        self.groups = {}                   # key -> group (e.g. the column's table)
+        self.payloads = {}
+        self.lengths = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, key, name, description="", payload=None, group=None):
+        if key in self.names:
+            raise ValueError(f"{key} is already indexed")
+        name_tokens = tokenize(name)
+        terms = Counter(name_tokens * 2 + tokenize(description))
+        for token, tf in terms.items():
+            if token not in self.postings:
+                for gram in trigrams(token):
+                    self.trigram_postings[gram].add(token)
+                self._corrections.clear()
+            self.postings[token][key] = tf
+        self.names[key] = set(name_tokens)
+        self.groups[key] = group
+        self.payloads[key] = payload
+        self.lengths[key] = sum(terms.values())
+        self._total_length += self.lengths[key]
+
+    def _correct(self, token):
+        """Closest indexed token to an out-of-vocabulary one, or the token itself"""
+        correction = self._corrections.get(token)
+        if correction is None:
+            shared = Counter()
+            for gram in trigrams(token):
+                shared.update(self.trigram_postings.get(gram, ()))
+            # ratio >= cutoff bounds the length of any match
+            low = len(token) * self.fuzzy_cutoff / (2 - self.fuzzy_cutoff)
+            high = len(token) * (2 - self.fuzzy_cutoff) / self.fuzzy_cutoff
+            candidates = [t for t, _ in shared.most_common() if low <= len(t) <= high][:self.fuzzy_candidates]
+            close = difflib.get_close_matches(token, candidates, n=1, cutoff=self.fuzzy_cutoff)
+            correction = close[0] if close else token
+            self._corrections[token] = correction
+        return correction
+
+    def _query_tokens(self, query):
+        """Query tokens, with out-of-vocabulary ones replaced by their fuzzy match"""
+        return [
+            self._correct(token) if token not in self.postings and len(token) >= 4 else token
+            for token in tokenize(query)
+        ]
+
+    def _in_groups(self, key, groups):
+        return groups is None or self.groups[key] in groups
+
+    def search(self, query, top_k=3, groups=None):
+        """[(key, bm25 score, payload)] best first, optionally only within `groups`"""
+        return self._search_tokens(set(self._query_tokens(query)), top_k, groups)
+
+    def _search_tokens(self, tokens, top_k, groups):
+        if not self.names:
+            return []
+        n = len(self.names)
+        avg_length = self._total_length / n
+        scores = Counter()
+        for token in tokens:
+            postings = self.postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for key, tf in postings.items():
+                if not self._in_groups(key, groups):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / avg_length)
+                scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return [(key, score, self.payloads[key]) for key, score in scores.most_common(top_k)]
+
+    def lookup(self, query, groups=None):
+        """Lexical evidence for `query`.
+
+        `exact`: keys whose whole name appears in the query (in any order).
+        `candidates`: keys sharing at least one name token with the query,
+        best BM25 first. Both are empty when the query names nothing.
+        `scores`: BM25 score of every candidate, so callers can tell a
+        distinctive name from a token most documents share (`id`, `date`).
+        """
+        tokens = set(self._query_tokens(query))
+        ranked = self._search_tokens(tokens, len(self.names), groups)
+        scores = {key: score for key, score, _ in ranked if self.names[key] & tokens}
+        named = list(scores)
+        exact = [key for key in named if self.names[key] <= tokens]
+        return {"exact": exact, "candidates": named, "scores": scores}
@@ -0,0 +1,187 @@
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy.engine import make_url
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+except ImportError:  # plain OpenAI SDK call sites (e.g. embeddings) don't need LangChain
+    BaseCallbackHandler = object
+
+# USD per 1K tokens: (prompt, completion). Update to match your Azure/OpenAI contract.
+MODEL_PRICES = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-1106": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "text-embedding-3-small": (0.00002, 0.0),
+    "text-embedding-3-large": (0.00013, 0.0),
+}
+
+
+_URL_PASSWORD = re.compile(r"(://[^:/@\s]+):[^@\s]*@")
+
+
+def schema_label(schema):
+    """Usage label for a schema or connection string, with any password masked.
+
+    Labels end up in logs and the /usage endpoint, and callers often pass a
+    full connection URI.
+    """
+    if not schema:
+        return schema
+    try:
+        return make_url(schema).render_as_string(hide_password=True)
+    except Exception:
+        return _URL_PASSWORD.sub(r"\1:***@", schema)
+
+
+def estimate_cost(model, prompt_tokens=0, completion_tokens=0):
+    prompt_price, completion_price = MODEL_PRICES.get(model or "", (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000
+
+
+class RequestUsage:
+    """Calls recorded while a usage_scope is active"""
+
+    def __init__(self, request_id, schema=None):
+        self.request_id = request_id
+        self.schema = schema_label(schema)
+        self.calls = []
+
+    def summary(self):
+        totals = defaultdict(float)
+        for call in self.calls:
+            for field in ("prompt_tokens", "completion_tokens", "embedding_tokens", "latency_s", "cost_usd"):
+                totals[field] += call[field]
+        return {"request_id": self.request_id, "schema": self.schema, "calls": self.calls,
+                "totals": {k: round(v, 6) for k, v in totals.items()}}
+
+
+_current_request: ContextVar = ContextVar("llm_usage_request", default=None)
+
+
+class UsageTracker:
+    """Thread-safe token, latency and cost counters per (call site, schema, model)"""
+
+    def __init__(self, max_recent=500):
+        self._lock = threading.Lock()
+        self._totals = defaultdict(lambda: defaultdict(float))
+        self.recent = deque(maxlen=max_recent)
+
+    def record(self, call_site, model=None, prompt_tokens=0, completion_tokens=0,
+               embedding_tokens=0, latency_s=0.0, schema=None):
+        request = _current_request.get()
+        schema = schema_label(schema) or (request.schema if request else None) or "-"
+        call = {
+            "call_site": call_site,
+            "schema": schema,
+            "model": model or "unknown",
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "embedding_tokens": embedding_tokens,
+            "latency_s": round(latency_s, 4),
+            "cost_usd": estimate_cost(model, prompt_tokens + embedding_tokens, completion_tokens),
+        }
+        with self._lock:
+            totals = self._totals[(call_site, schema, call["model"])]
+            totals["calls"] += 1
+            for field in ("prompt_tokens", "completion_tokens", "embedding_tokens", "latency_s", "cost_usd"):
+                totals[field] += call[field]
+            self.recent.append(call)
+        if request is not None:
+            request.calls.append(call)
+        logging.debug(f"💰 {call_site} [{schema}] {call['model']}: "
+                      f"{prompt_tokens}+{completion_tokens}+{embedding_tokens} tokens in {latency_s:.2f}s")
+        return call
+
+    def summary(self, sort_by="cost_usd"):
+        """Aggregated counters, hottest call sites first"""
+        with self._lock:
+            rows = [
+                {"call_site": site, "schema": schema, "model": model,
+                 **{k: round(v, 6) for k, v in totals.items()}}
+                for (site, schema, model), totals in self._totals.items()
+            ]
+        return sorted(rows, key=lambda r: r.get(sort_by, 0), reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._totals.clear()
+            self.recent.clear()
+
+
+USAGE = UsageTracker()
+
+
+@contextmanager
+def usage_scope(request_id=None, schema=None):
+    """Collect a per-request breakdown of every LLM/embedding call made inside the block"""
+    request = RequestUsage(request_id or uuid.uuid4().hex[:12], schema)
+    token = _current_request.set(request)
+    try:
+        yield request
+    finally:
+        _current_request.reset(token)
+
+
+def _usage_field(usage, name):
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get(name, 0) or 0
+    return getattr(usage, name, 0) or 0
+
+
+def record_openai_response(call_site, response, latency_s, model=None, embedding=False, schema=None):
+    """Record usage from an OpenAI SDK response (v1 objects or 0.x dicts)"""
+    usage = response.get("usage") if isinstance(response, dict) else getattr(response, "usage", None)
+    model = model or (response.get("model") if isinstance(response, dict) else getattr(response, "model", None))
+    if embedding:
+        return USAGE.record(call_site, model, embedding_tokens=_usage_field(usage, "prompt_tokens"),
+                            latency_s=latency_s, schema=schema)
+    return USAGE.record(call_site, model,
+                        prompt_tokens=_usage_field(usage, "prompt_tokens"),
+                        completion_tokens=_usage_field(usage, "completion_tokens"),
+                        latency_s=latency_s, schema=schema)
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """LangChain callback that records every LLM call made by a chain or agent"""
+
+    def __init__(self, call_site, schema=None):
+        self.call_site = call_site
+        self.schema = schema_label(schema)
+        self._started = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        latency = time.perf_counter() - self._started.pop(run_id, time.perf_counter())
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or {}
+        model = llm_output.get("model_name")
+        if not usage:
+            # Newer chat models report usage on the message instead of llm_output
+            for generations in response.generations:
+                for generation in generations:
+                    meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    usage = {"prompt_tokens": usage.get("prompt_tokens", 0) + meta.get("input_tokens", 0),
+                             "completion_tokens": usage.get("completion_tokens", 0) + meta.get("output_tokens", 0)}
+        USAGE.record(self.call_site, model,
+                     prompt_tokens=usage.get("prompt_tokens", 0),
+                     completion_tokens=usage.get("completion_tokens", 0),
+                     latency_s=latency, schema=self.schema)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._started.pop(run_id, None)
@@ -1,6 +1,14 @@
-from functools import lru_cache
+from sql_guard import QueryGuard, guard_tools
+from executor_registry import EXECUTOR_REGISTRY, executor_fingerprint, llm_config
+from llm_usage import UsageCallbackHandler
 
 class LangChainSQLAgent:
+    EXECUTOR_OPTIONS = {
+        "verbose": False,
+        "handle_parsing_errors": True,
+        "return_intermediate_steps": False,
+        "early_stopping_method": "generate"
+    }
 
     def __init__(self, conn_str, azure_config):
         self.conn_str = conn_str
@@ -34,7 +42,8 @@ class LangChainSQLAgent:
 
     def _setup_tools(self):
         toolkit = SQLDatabaseToolkit(db=self.db, llm=self.llm)
-        self.tools = toolkit.get_tools()
+        self.guard = QueryGuard(self.db._engine)
+        self.tools = guard_tools(toolkit.get_tools(), self.guard)
         print("Tools Initialized:", self.tools)
 
     def prepare_inputs(self, query, top_k):
@@ -49,36 +58,23 @@ class LangChainSQLAgent:
         query = query.strip().lower()
         executor = self._get_or_create_executor(system_prompt)
         prepared_input = self.prepare_inputs(query, top_k)
-        result = executor.invoke(prepared_input)
+        usage = UsageCallbackHandler("LangChainSQLAgent.run_query", schema=self.conn_str)
+        result = executor.invoke(prepared_input, config={"callbacks": [usage]})
         return result["output"]
 
-    # ✅ LRU Caching for agent executor (avoiding `self`)
-    @staticmethod
-    @lru_cache(maxsize=128)
-    def _cached_executor(system_prompt_key: str, llm_id: str, tools_id: str):
-        """Internal static cache-safe function"""
+    def _build_executor(self, system_prompt: str):
         from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
         prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt_key),
+            ("system", system_prompt),
             ("human", "{input}"),
             MessagesPlaceholder(variable_name="agent_scratchpad")
         ])
-        agent = create_openai_tools_agent(llm=llm_id, tools=tools_id, prompt=prompt)
-        return AgentExecutor(
-            agent=agent,
-            tools=tools_id,
-            verbose=False,
-            handle_parsing_errors=True,
-            return_intermediate_steps=False,
-            early_stopping_method="generate"
-        )
+        agent = create_openai_tools_agent(llm=self.llm, tools=self.tools, prompt=prompt)
+        return AgentExecutor(agent=agent, tools=self.tools, **self.EXECUTOR_OPTIONS)
 
     def _get_or_create_executor(self, system_prompt: str):
-        """Wraps the cached executor with hashable identifiers"""
+        """Shared executor lookup keyed by prompt, model config, executor options and tool schemas"""
         system_prompt_key = system_prompt.strip()
-        # We can use id() to identify toolset/llm (or any stable string)
-        llm_id = str(id(self.llm))
-        tools_id = str(id(tuple(self.tools)))  # Must be hashable
-        return self._cached_executor(system_prompt_key, llm_id, tools_id)
-
-
+        key = executor_fingerprint(system_prompt_key, llm_config(self.llm), self.tools, scope=self.conn_str,
+                                   executor_options=self.EXECUTOR_OPTIONS)
+        return EXECUTOR_REGISTRY.get_or_create(key, lambda: self._build_executor(system_prompt_key))
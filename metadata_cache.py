@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+
+from sqlalchemy import MetaData, text
+
+METADATA_CACHE_DIR = os.getenv("METADATA_CACHE_DIR", ".metadata_cache")
+
+# One cheap catalog query per dialect: a row per column (or per table DDL for SQLite)
+_FINGERPRINT_SQL = {
+    "sqlite": """
+        SELECT tbl_name, type, name, sql FROM {schema_prefix}sqlite_master
+        WHERE tbl_name NOT LIKE 'sqlite_%' AND sql IS NOT NULL
+        ORDER BY tbl_name, type, name
+    """,
+    "information_schema": """
+        SELECT c.table_name, c.column_name, c.ordinal_position, c.data_type, c.is_nullable, c.column_default,
+               k.constraint_name, k.position_in_unique_constraint
+        FROM information_schema.columns c
+        LEFT JOIN information_schema.key_column_usage k
+          ON k.table_schema = c.table_schema AND k.table_name = c.table_name AND k.column_name = c.column_name
+        WHERE c.table_schema = {schema_expr}
+        ORDER BY c.table_name, c.ordinal_position, k.constraint_name
+    """,
+}
+_DEFAULT_SCHEMA_SQL = {"postgresql": "current_schema()", "mysql": "DATABASE()", "mariadb": "DATABASE()",
+                       "mssql": "SCHEMA_NAME()"}
+
+
+def table_fingerprints(engine, schema=None):
+    """{table: hash of its definition} from a single catalog query; no reflection"""
+    dialect = engine.dialect.name
+    if dialect == "sqlite":
+        sql, params = _FINGERPRINT_SQL["sqlite"].format(schema_prefix=f"{schema}." if schema else ""), {}
+    else:
+        schema_expr = ":schema" if schema else _DEFAULT_SCHEMA_SQL.get(dialect, "current_schema()")
+        sql, params = _FINGERPRINT_SQL["information_schema"].format(schema_expr=schema_expr), {"schema": schema}
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).fetchall()
+    hashes = {}
+    for row in rows:
+        table = row[0]
+        hashes.setdefault(table, hashlib.sha256()).update(repr(tuple(row[1:])).encode("utf-8"))
+    return {table: h.hexdigest() for table, h in hashes.items()}
+
+
+def catalog_fingerprint(engine, schema=None, fingerprints=None):
+    """One hash for the whole schema: changes with any table definition"""
+    fingerprints = fingerprints if fingerprints is not None else table_fingerprints(engine, schema)
+    raw = repr((engine.url.render_as_string(hide_password=True), schema, sorted(fingerprints.items())))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def reflect_tables(engine, schema, tables, metadata):
+    """Default reflection: one reflect() call for the given tables.
+
+    FK targets aren't reflected along with them (resolve_fks=False); they
+    are either in `tables` or already in `metadata`.
+    """
+    metadata.reflect(bind=engine, schema=schema, only=list(tables), resolve_fks=False)
+
+
+class MetadataCache:
+    """Reflected MetaData cached in memory and on disk, validated by table fingerprints.
+
+    Entries are keyed by connection identity (URL without password, plus
+    schema). Each load() runs only the fingerprint query. When something
+    changed, only changed or new tables are reflected; unchanged ones are
+    copied into a fresh MetaData. That way FKs resolve to the new versions
+    of changed tables, and MetaData handed out earlier is never mutated.
+    """
+
+    def __init__(self, cache_dir=METADATA_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._entries = {}   # key -> {"fingerprints": ..., "metadata": ...}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {}      # key -> what the last load did
+
+    @staticmethod
+    def key(engine, schema=None):
+        return f"{engine.url.render_as_string(hide_password=True)}|{schema or ''}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:24] + ".pickle")
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _read(self, key):
+        if key in self._entries:
+            return self._entries[key]
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"⚠️ Ignoring unreadable metadata cache for {key}: {e}")
+            return None
+
+    def _write(self, key, entry):
+        self._entries[key] = entry
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = self._path(key) + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))
+        except (RecursionError, pickle.PicklingError, OSError) as e:
+            # Very long FK chains nest too deeply for pickle; keep the entry in memory only
+            logging.warning(f"⚠️ Metadata for {key} cached in memory only: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def load(self, engine, schema=None, reflect=reflect_tables):
+        """MetaData for `schema`, re-reflecting only what changed since it was cached.
+
+        `reflect(engine, schema, tables, metadata)` does the actual reflection
+        (see reflection_service.py for a parallel one).
+        """
+        key = self.key(engine, schema)
+        with self._key_lock(key):
+            start = time.perf_counter()
+            fingerprints = table_fingerprints(engine, schema)
+            entry = self._read(key)
+            if entry is None:
+                metadata = MetaData()
+                changed, removed = sorted(fingerprints), []
+            else:
+                metadata = entry["metadata"]
+                cached = entry["fingerprints"]
+                changed = sorted(t for t, h in fingerprints.items() if cached.get(t) != h)
+                removed = sorted(t for t in cached if t not in fingerprints)
+
+            reflected = changed
+            if changed or removed or entry is None:
+                fresh = MetaData()
+                stale = set(changed) | set(removed)
+                for table in metadata.tables.values():
+                    if table.name not in stale:
+                        table.to_metadata(fresh)
+                if changed:
+                    reflect(engine, schema, changed, fresh)
+                metadata = fresh
+                self._write(key, {"fingerprints": fingerprints, "metadata": metadata})
+            else:
+                self._entries[key] = entry
+
+            self.stats[key] = {
+                "source": "reflected" if entry is None else ("partial" if reflected or removed else "cache"),
+                "tables": len(fingerprints),
+                "reflected": len(reflected),
+                "removed": len(removed),
+                "seconds": round(time.perf_counter() - start, 3),
+            }
+            logging.info(f"📚 Metadata for {key}: {self.stats[key]}")
+            return metadata
+
+    def invalidate(self, engine, schema=None):
+        key = self.key(engine, schema)
+        self._entries.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+METADATA_CACHE = MetadataCache()
+
+
+def reflect_metadata(engine, schema=None):
+    """Drop-in for MetaData().reflect(bind=engine, schema=schema), served from METADATA_CACHE"""
+    return METADATA_CACHE.load(engine, schema)
@@ -0,0 +1,102 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import CancelledError, Future
+
+
+class MicroBatcher:
+    """Collects concurrent requests and hands them to `handler` as one batch.
+
+    A batch is closed when it reaches `max_batch_size` items or when
+    `max_wait_ms` has passed since its first item arrived, whichever comes
+    first. Larger values mean bigger batches (fewer API calls, better
+    throughput); smaller values mean lower latency per request.
+
+    `handler(items)` returns one result per item, in order; a result that is
+    an exception is raised to that item's caller only. A result may also be
+    a Future (e.g. work handed to a pool): the caller's future is resolved
+    when it completes, and the batching thread moves on to the next batch
+    without waiting for it.
+    """
+
+    def __init__(self, handler, max_batch_size=32, max_wait_ms=10, name="micro-batcher"):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def submit(self, item):
+        """Future for `item`'s result"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_ms / 1000
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Callers that gave up (e.g. a disconnected client) cancel their future; drop those
+            batch = [(item, future) for item, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = self.handler(items)
+            except Exception as e:
+                logging.error(f"❌ {self.name}: batch of {len(items)} failed: {e}")
+                results = [e] * len(items)
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Future):
+                    result.add_done_callback(lambda done, future=future: self._deliver(future, done))
+                else:
+                    self._deliver(future, result)
+
+    def _deliver(self, future, result):
+        try:
+            if isinstance(result, Future):
+                try:
+                    result = result.result()
+                except (Exception, CancelledError) as e:
+                    result = e
+            if isinstance(result, (Exception, CancelledError)):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+        except Exception as e:
+            logging.error(f"❌ {self.name}: could not deliver a result: {e}")
+
+    def info(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else None,
+            "queued": self._queue.qsize(),
+        }
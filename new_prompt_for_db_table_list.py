@@ -6,32 +6,14 @@ from langchain_openai import AzureChatOpenAI
 from langchain_community.agent_toolkits import SQLDatabaseToolkit
 from langchain.agents import AgentExecutor, create_openai_tools_agent
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from sqlalchemy import create_engine
+from fk_graph import FKDependencyResolver
+from llm_usage import UsageCallbackHandler
 
-# --- Azure OpenAI Setup ---
-if not os.environ.get("AZURE_OPENAI_API_KEY"):
-    os.environ["AZURE_OPENAI_API_KEY"] = getpass("Azure OpenAI API Key: ")
-    
-if not os.environ.get("AZURE_OPENAI_ENDPOINT"):
-    os.environ["AZURE_OPENAI_ENDPOINT"] = getpass("Azure OpenAI Endpoint: ")
-
-# Initialize GPT-4.1 model
-llm = AzureChatOpenAI(
-    deployment_name="gpt-4-1106",  # Replace with your Azure deployment name
-    api_version="2024-05-01-preview",  # Latest stable version
-    temperature=0,
-    max_retries=3
-)
-
-# --- Database Connection with Enhanced Metadata ---
-db = SQLDatabase.from_uri(
-    "sqlite:///your_database.db",
-    include_foreign_keys=True,  # Critical for relationship mapping
-    view_support=True           # Includes views in schema analysis
-)
-
-# --- Create Toolkit ---
-toolkit = SQLDatabaseToolkit(db=db, llm=llm)
-tools = toolkit.get_tools()
+DB_URI = "sqlite:///your_database.db"
+
+# --- Deterministic resolver from declared foreign keys (no LLM involved) ---
+resolver = FKDependencyResolver(create_engine(DB_URI))
 
 # --- Focused Prompt for Critical Dependencies ---
 SYSTEM_PROMPT = """
@@ -57,52 +39,99 @@ Workflow:
 3. Return comma-separated list
 """.strip()
 
-# Create the prompt template
-prompt = ChatPromptTemplate.from_messages([
-    ("system", SYSTEM_PROMPT),
-    ("human", "{input}"),
-    MessagesPlaceholder(variable_name="agent_scratchpad")
-])
-
-# --- Build the Agent ---
-agent = create_openai_tools_agent(
-    llm=llm,
-    tools=tools,
-    prompt=prompt
-)
-
-# Create input processor
-def prepare_inputs(input_dict):
-    return {
-        "input": input_dict["input"],
-        "dialect": db.dialect,
-        "top_k": 1,  # Minimize result size
-        "agent_scratchpad": [] 
-    }
-
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=False,  # Disable verbose output
-    handle_parsing_errors=True,
-    return_intermediate_steps=False  # Only final output
-)
+# --- LLM fallback, only built when explicitly requested ---
+_agent_executor = None
+
+def get_agent_executor():
+    global _agent_executor
+    if _agent_executor is not None:
+        return _agent_executor
+
+    # --- Azure OpenAI Setup ---
+    if not os.environ.get("AZURE_OPENAI_API_KEY"):
+        os.environ["AZURE_OPENAI_API_KEY"] = getpass("Azure OpenAI API Key: ")
+
+    if not os.environ.get("AZURE_OPENAI_ENDPOINT"):
+        os.environ["AZURE_OPENAI_ENDPOINT"] = getpass("Azure OpenAI Endpoint: ")
+
+    # Initialize GPT-4.1 model
+    llm = AzureChatOpenAI(
+        deployment_name="gpt-4-1106",  # Replace with your Azure deployment name
+        api_version="2024-05-01-preview",  # Latest stable version
+        temperature=0,
+        max_retries=3
+    )
+
+    # --- Database Connection with Enhanced Metadata ---
+    db = SQLDatabase.from_uri(
+        DB_URI,
+        include_foreign_keys=True,  # Critical for relationship mapping
+        view_support=True           # Includes views in schema analysis
+    )
+
+    # --- Create Toolkit ---
+    toolkit = SQLDatabaseToolkit(db=db, llm=llm)
+    tools = toolkit.get_tools()
+
+    # Create the prompt template
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        ("human", "{input}"),
+        MessagesPlaceholder(variable_name="agent_scratchpad")
+    ])
+
+    # --- Build the Agent ---
+    agent = create_openai_tools_agent(
+        llm=llm,
+        tools=tools,
+        prompt=prompt
+    )
+
+    _agent_executor = AgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=False,  # Disable verbose output
+        handle_parsing_errors=True,
+        return_intermediate_steps=False  # Only final output
+    )
+    return _agent_executor
 
 # --- Focused Dependency Extractor ---
-def get_critical_dependencies(table_name: str) -> List[str]:
-    """Get critical dependencies for a table as a clean list"""
-    response = agent_executor.invoke({
+def get_llm_dependencies(table_name: str, declared: List[str]) -> List[str]:
+    """Ask the LLM only for relationships that are not declared as foreign keys"""
+    known = ", ".join(declared) if declared else "none"
+    response = get_agent_executor().invoke({
         "input": f"What tables are critically dependent for generating {table_name} data? "
-                 f"Return ONLY comma-separated table names."
-    })
-    
+                 f"Declared foreign key dependencies (already known): {known}. "
+                 f"Return ONLY comma-separated names of additional tables that are required "
+                 f"through undeclared relationships, or nothing if there are none."
+    }, config={"callbacks": [UsageCallbackHandler("get_critical_dependencies", schema=DB_URI)]})
+
     # Extract and clean the table list
     output = response.get("output", "").strip()
     if not output:
         return []
-    
-    # Parse comma-separated list and clean
+
+    # Parse comma-separated list, keeping only real tables we don't already know about
     tables = [t.strip() for t in output.split(",") if t.strip()]
+    return [t for t in tables if t in resolver.parents and t not in declared and t != table_name]
+
+
+def get_critical_dependencies(table_name: str, transitive: bool = False,
+                              use_llm_fallback: bool = False) -> List[str]:
+    """Get critical dependencies for a table as a clean list.
+
+    Resolved from the catalog's foreign keys; `transitive=True` returns every
+    required ancestor in generation order. The LLM is only consulted when
+    `use_llm_fallback=True`, to add relationships the schema doesn't declare.
+    """
+    if transitive:
+        tables = resolver.transitive_parents(table_name)
+    else:
+        tables = resolver.direct_parents(table_name)
+
+    if use_llm_fallback:
+        tables = tables + get_llm_dependencies(table_name, tables)
     return tables
 
 # --- Example Usage ---
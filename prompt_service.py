@@ -0,0 +1,68 @@
+# prompt_service.py
+# HTTP front end for embading_deep's prompt-to-SQL pipeline.
+# Concurrent prompts are micro-batched: one embeddings call and one matrix
+# product per batch, with each prompt's SQL on a per-thread connection. The
+# next batch is collected while the previous batch's SQL is still running.
+#
+# Tuning (environment):
+#   PROMPT_BATCH_MAX_SIZE    prompts per batch (higher = more throughput)
+#   PROMPT_BATCH_MAX_WAIT_MS how long the first prompt waits for company (lower = less latency)
+#   SQL_WORKERS              threads executing SQL (see embading_deep)
+
+import asyncio
+import os
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+import embading_deep as ed
+from micro_batcher import MicroBatcher
+
+batcher = MicroBatcher(
+    ed.submit_prompts_batch,
+    max_batch_size=int(os.getenv("PROMPT_BATCH_MAX_SIZE", "32")),
+    max_wait_ms=float(os.getenv("PROMPT_BATCH_MAX_WAIT_MS", "10")),
+    name="prompt-batcher"
+)
+
+app = FastAPI()
+
+class PromptRequest(BaseModel):
+    prompt: str
+
+@app.on_event("startup")
+def warm_up():
+    ed.warm_up(background=True)
+
+@app.post("/prompt")
+async def run_prompt(request: PromptRequest):
+    try:
+        result = await asyncio.wrap_future(batcher.submit(request.prompt))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {
+        "query": result["query"],
+        "params": result["params"],
+        "rows": result["result"].astype(object).where(result["result"].notna(), None).to_dict(orient="records"),
+        "reference_transfer": result["reference_transfer"]["total"],
+        "cache_hit": result["cache_hit"]
+    }
+
+@app.get("/ready")
+def ready():
+    return ed.readiness()
+
+@app.get("/stats")
+def stats():
+    return {
+        "batching": batcher.info(),
+        "result_cache": ed.result_cache.info(),
+        "embedding_cache": ed.prompt_embeddings.info(),
+        "lexical": dict(ed.LEXICAL_METRICS)
+    }
+
+if __name__ == "__main__":
+    uvicorn.run("prompt_service:app", host="0.0.0.0", port=8090, reload=False)
@@ -0,0 +1,39 @@
+# quantization_benchmark.py
+# Memory and ranking agreement of float16 / int8 schema indexes vs. full precision,
+# on vectors shaped like text-embedding-3-large (3072 dims).
+
+import sys
+import time
+import numpy as np
+from ann_benchmark import make_catalog
+from vector_index import VectorIndex, INDEX_DTYPES
+
+N_VECTORS = 20_000
+DIM = 3072
+TOP_K = 10
+
+def python_list_bytes(vectors, sample=20):
+    """Size of the vectors held as Python lists of floats (what table_embeddings used to be)"""
+    rows = [list(map(float, v)) for v in vectors[:sample]]
+    per_row = np.mean([sys.getsizeof(r) + sum(sys.getsizeof(x) for x in r) for r in rows])
+    return per_row * len(vectors)
+
+if __name__ == "__main__":
+    vectors, queries = make_catalog(N_VECTORS, DIM, n_topics=500)
+    keys = list(range(N_VECTORS))
+
+    reference = VectorIndex(keys, vectors, dtype="float32")
+    truth = [[k for k, _, _ in hits] for hits in reference.search_batch(queries, top_k=TOP_K)]
+
+    print(f"{N_VECTORS} x {DIM} vectors, {len(queries)} queries")
+    print(f"Python lists of floats: {python_list_bytes(vectors) / 2**20:>9.1f} MiB")
+    print(f"\n{'dtype':>8} {'MiB':>8} {'vs f32':>7} {'top-1 agree':>12} {'recall@' + str(TOP_K):>10} {'ms/query':>9}")
+    for dtype in INDEX_DTYPES:
+        index = VectorIndex(keys, vectors, dtype=dtype)
+        start = time.perf_counter()
+        found = [[k for k, _, _ in index.search(q, top_k=TOP_K)] for q in queries]
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        top1 = np.mean([f[0] == t[0] for f, t in zip(found, truth)])
+        recall = np.mean([len(set(f) & set(t)) / TOP_K for f, t in zip(found, truth)])
+        print(f"{dtype:>8} {index.nbytes / 2**20:>8.1f} {reference.nbytes / index.nbytes:>6.1f}x "
+              f"{top1:>12.3f} {recall:>10.3f} {ms:>9.2f}")
@@ -0,0 +1,144 @@
+# reflection_service.py
+# Reflects every registered schema (data.json: db_type -> db_server -> db_name -> schema)
+# concurrently and stores the results in the shared metadata cache, so later
+# reflect_metadata() calls in the app only pay for the fingerprint query.
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import MetaData, create_engine
+
+from metadata_cache import METADATA_CACHE, reflect_tables
+
+DATA_FILE = os.getenv("SCHEMA_REGISTRY_FILE", "../app/data.json")
+
+MAX_SCHEMAS_IN_FLIGHT = 4    # schemas being reflected at once
+MAX_CONNECTIONS = 8          # concurrent reflection queries across all schemas
+TABLE_BATCH_SIZE = 100       # large schemas are split into batches reflected in parallel
+
+# Registry db_type -> SQLAlchemy dialect+driver
+DB_DRIVERS = {
+    "postgresql": "postgresql",
+    "mysql": "mysql+pymysql",
+    "mssql": "mssql+pyodbc",
+    "oracle": "oracle+oracledb",
+    "sqlite": "sqlite",
+}
+
+
+def load_registry(path=DATA_FILE):
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def registered_schemas(registry):
+    """(db_type, db_server, db_name, schema) for every registered schema"""
+    return [
+        (db_type, db_server, db_name, schema)
+        for db_type, servers in registry.items()
+        for db_server, databases in servers.items()
+        for db_name, schemas in databases.items()
+        for schema in schemas
+    ]
+
+
+def connection_url(db_type, db_server, db_name):
+    driver = DB_DRIVERS.get(db_type.lower())
+    if driver is None:
+        raise ValueError(f"Unsupported database type: {db_type}")
+    if driver == "sqlite":
+        return f"sqlite:///{db_name}"
+    return f"{driver}://{db_server}/{db_name}"
+
+
+class ReflectionService:
+    """Reflects many schemas at once with bounded parallelism.
+
+    Schemas run on one pool (`max_schemas`); their table batches run on a
+    second pool (`max_connections`), so a schema waiting on its batches
+    never blocks a batch from starting. Engines are shared per database.
+    """
+
+    def __init__(self, cache=METADATA_CACHE, max_schemas=MAX_SCHEMAS_IN_FLIGHT,
+                 max_connections=MAX_CONNECTIONS, table_batch_size=TABLE_BATCH_SIZE):
+        self.cache = cache
+        self.max_schemas = max_schemas
+        self.max_connections = max_connections
+        self.table_batch_size = table_batch_size
+        self._engines = {}
+        self._lock = threading.Lock()
+        self._batch_pool = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="reflect-batch")
+
+    def engine(self, url):
+        with self._lock:
+            if url not in self._engines:
+                kwargs = {} if url.startswith("sqlite") else {"pool_size": self.max_connections, "pool_pre_ping": True}
+                self._engines[url] = create_engine(url, **kwargs)
+            return self._engines[url]
+
+    def reflect_batched(self, engine, schema, tables, metadata):
+        """metadata_cache reflect hook: table batches reflected concurrently, merged afterwards"""
+        tables = list(tables)
+        if len(tables) <= self.table_batch_size:
+            reflect_tables(engine, schema, tables, metadata)
+            return
+
+        def reflect_batch(batch):
+            part = MetaData()
+            reflect_tables(engine, schema, batch, part)
+            return part
+
+        batches = [tables[i:i + self.table_batch_size] for i in range(0, len(tables), self.table_batch_size)]
+        # MetaData isn't thread-safe: batches fill their own, then get merged here; FKs resolve by name
+        for part in self._batch_pool.map(reflect_batch, batches):
+            for table in part.tables.values():
+                table.to_metadata(metadata)
+
+    def reflect_schema(self, db_type, db_server, db_name, schema):
+        engine = self.engine(connection_url(db_type, db_server, db_name))
+        start = time.perf_counter()
+        metadata = self.cache.load(engine, schema, reflect=self.reflect_batched)
+        stats = self.cache.stats[self.cache.key(engine, schema)]
+        return metadata, {**stats, "seconds": round(time.perf_counter() - start, 3)}
+
+    def reflect_all(self, entries):
+        """Reflect (db_type, db_server, db_name, schema) entries; returns per-schema timings.
+
+        A schema that fails is reported with its error; the others still load.
+        """
+        def run(entry):
+            try:
+                return self.reflect_schema(*entry)[1]
+            except Exception as e:
+                logging.error(f"❌ Reflection failed for {'.'.join(entry)}: {e}")
+                return {"error": str(e)}
+
+        start = time.perf_counter()
+        entries = list(entries)
+        with ThreadPoolExecutor(max_workers=self.max_schemas, thread_name_prefix="reflect-schema") as pool:
+            results = dict(zip([".".join(e) for e in entries], pool.map(run, entries)))
+        logging.info(f"📚 Reflected {len(entries)} schemas in {time.perf_counter() - start:.2f}s")
+        return results
+
+
+def warm_registered_schemas(path=DATA_FILE, service=None):
+    """Reflect every schema in the registry into the shared metadata cache"""
+    service = service or ReflectionService()
+    return service.reflect_all(registered_schemas(load_registry(path)))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    report = warm_registered_schemas()
+    print(f"\n{'schema':<50} {'source':>10} {'tables':>7} {'reflected':>10} {'seconds':>8}")
+    for label, stats in sorted(report.items(), key=lambda item: -item[1].get("seconds", 0)):
+        if "error" in stats:
+            print(f"{label:<50} error: {stats['error']}")
+        else:
+            print(f"{label:<50} {stats['source']:>10} {stats['tables']:>7} {stats['reflected']:>10} {stats['seconds']:>8.2f}")
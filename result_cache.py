@@ -0,0 +1,170 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+VERSION_TABLE = "_data_version"
+
+
+# --- Data versions ---
+def install_version_triggers(conn, tables):
+    """Keep a per-table version counter that every INSERT/UPDATE/DELETE bumps (SQLite)"""
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (table_name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+    for table in tables:
+        conn.execute(f"INSERT OR IGNORE INTO {VERSION_TABLE} VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version AFTER {event} ON {table}
+                BEGIN
+                    UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+    conn.commit()
+
+
+def table_versions(conn, tables):
+    """(table, version) pairs in sorted table order, for use in cache keys"""
+    tables = sorted(tables)
+    placeholders = ", ".join("?" * len(tables))
+    rows = dict(conn.execute(
+        f"SELECT table_name, version FROM {VERSION_TABLE} WHERE table_name IN ({placeholders})", tables
+    ).fetchall())
+    return tuple((table, rows.get(table)) for table in tables)
+
+
+def normalize_sql(sql):
+    return " ".join(sql.split())
+
+
+def cache_key(sql, params, versions):
+    return normalize_sql(sql), tuple(sorted((params or {}).items())), versions
+
+
+# --- Columnar storage ---
+class ColumnarFrame:
+    """A DataFrame kept as one NumPy array per column.
+
+    Numeric columns keep their dtype; nullable Int/boolean columns keep their
+    values and NA mask and come back as the same extension arrays. Text columns are stored Arrow-style:
+    one UTF-8 byte buffer plus int64 offsets and a null mask, so their size
+    follows the total text length rather than the longest value. Anything
+    else stays an object array.
+    """
+
+    def __init__(self, frame):
+        self.columns = list(frame.columns)
+        self.arrays = {}
+        self.text = {}    # col -> (offsets, utf-8 bytes)
+        self.masks = {}
+        self.dtypes = {}  # col -> extension dtype of masked (nullable Int/boolean) columns
+        for col in self.columns:
+            array = frame[col].array
+            if isinstance(array, (pd.arrays.IntegerArray, pd.arrays.BooleanArray)):
+                self.arrays[col] = array._data
+                self.masks[col] = array._mask
+                self.dtypes[col] = frame[col].dtype
+                continue
+            values = frame[col].to_numpy()
+            if values.dtype == object:
+                nulls = pd.isna(frame[col]).to_numpy()
+                present = values[~nulls]
+                if all(isinstance(v, str) for v in present):
+                    encoded = [b"" if null else v.encode("utf-8") for v, null in zip(values, nulls)]
+                    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+                    self.text[col] = (offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8))
+                    if nulls.any():
+                        self.masks[col] = nulls
+                    continue
+            self.arrays[col] = values
+
+    @property
+    def nbytes(self):
+        total = sum(a.nbytes for a in self.arrays.values()) + sum(m.nbytes for m in self.masks.values())
+        total += sum(offsets.nbytes + data.nbytes for offsets, data in self.text.values())
+        # Object arrays only hold pointers; count the objects they point at too
+        for values in self.arrays.values():
+            if values.dtype == object:
+                total += sum(len(str(v)) for v in values)
+        return total
+
+    def to_frame(self):
+        data = {}
+        for col in self.columns:
+            if col in self.text:
+                offsets, buffer = self.text[col]
+                buffer = buffer.tobytes()
+                values = np.empty(len(offsets) - 1, dtype=object)
+                values[:] = [buffer[start:end].decode("utf-8") for start, end in zip(offsets[:-1], offsets[1:])]
+                if col in self.masks:
+                    values[self.masks[col]] = None
+            elif col in self.dtypes:
+                array_cls = pd.arrays.BooleanArray if self.dtypes[col] == "boolean" else pd.arrays.IntegerArray
+                values = pd.Series(array_cls(self.arrays[col], self.masks[col]), dtype=self.dtypes[col])
+            else:
+                values = self.arrays[col]
+            data[col] = values
+        return pd.DataFrame(data, columns=self.columns)
+
+
+# --- Cache ---
+class ResultCache:
+    """LRU of query results bounded by total bytes, not entry count.
+
+    Callers build keys with cache_key(sql, params, table_versions(...)), so
+    any write to a table the query reads changes the key and old entries
+    simply age out.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        """Store `value`; entries larger than the whole budget aren't cached"""
+        if nbytes > self.max_bytes:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def info(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
@@ -1,8 +1,10 @@
 # pipeline_with_rules.py
 
-from sqlalchemy import create_engine, MetaData, inspect
+from sqlalchemy import create_engine
 import pandas as pd
 import os
+from columnar_reader import read_columnar, table_dtypes
+from metadata_cache import reflect_metadata
 
 from sdv.metadata import MultiTableMetadata
 from sdv.multi_table import HMASynthesizer
@@ -12,15 +14,14 @@ from sdv.constraints import FixedCombinations, Inequality, CustomConstraint
 
 def extract_schema_and_data(connection_str):
     engine = create_engine(connection_str)
-    inspector = inspect(engine)
-    metadata = MetaData()
-    metadata.reflect(bind=engine)
+    metadata = reflect_metadata(engine)
 
     tables = {}
     with engine.connect() as conn:
-        for table_name in inspector.get_table_names():
-            df = pd.read_sql_table(table_name, conn)
-            tables[table_name] = df
+        for table_name, table in metadata.tables.items():
+            # Typed column buffers filled block by block instead of an object frame built row by row
+            result = conn.execution_options(stream_results=True).execute(table.select())
+            tables[table_name] = read_columnar(result, table_dtypes(table))
     return tables, metadata
 
 # --- Step 2: Detect metadata and relationships with SDV ---
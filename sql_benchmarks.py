@@ -0,0 +1,57 @@
+# sql_benchmarks.py
+# Literal vs. parameterized SQL for many prompts of the same shape.
+# Literal SQL differs per value, so every execution is parsed and planned
+# again; parameterized SQL has one text, so sqlite3's statement cache and
+# SQLAlchemy's compiled cache are reused.
+
+import re
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import embading_deep as ed
+
+N_PROMPTS = 5_000
+PROMPT_SHAPE = "participants with age > {} where code is US"
+
+def inline_params(query, params):
+    """The pre-parameterization SQL: values pasted in as quoted literals"""
+    return re.sub(r":(p\d+)", lambda m: f"'{params[m.group(1)]}'", query)
+
+def workload():
+    """(query, params) per prompt; generation itself isn't part of the timing"""
+    query, params, _ = ed.generate_query_from_prompt(PROMPT_SHAPE.format(30))
+    age_param = next(name for name, value in params.items() if value == 30)
+    return [(query, {**params, age_param: age}) for age in range(N_PROMPTS)]
+
+def run_sqlite(conn, statements):
+    start = time.perf_counter()
+    for query, params in statements:
+        conn.execute(query, params).fetchall()
+    return (time.perf_counter() - start) * 1e6 / len(statements)
+
+def run_sqlalchemy(engine, statements):
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        for query, params in statements:
+            conn.execute(text(query), params).fetchall()
+    return (time.perf_counter() - start) * 1e6 / len(statements)
+
+if __name__ == "__main__":
+    conn = ed.get_connection()
+    parameterized = workload()
+    literal = [(inline_params(query, params), {}) for query, params in parameterized]
+    print(f"{N_PROMPTS} prompts of shape: {PROMPT_SHAPE!r}")
+    print(f"Distinct SQL texts: literal={len({q for q, _ in literal})}, parameterized={len({q for q, _ in parameterized})}")
+
+    print(f"\n{'executor':<28} {'literal us':>11} {'param us':>10} {'speedup':>8}")
+    literal_us = run_sqlite(conn, literal)
+    param_us = run_sqlite(conn, parameterized)
+    print(f"{'sqlite3 (statement cache)':<28} {literal_us:>11.1f} {param_us:>10.1f} {literal_us / param_us:>7.1f}x")
+
+    # Same in-memory database through SQLAlchemy, which also caches compiled statements
+    engine = create_engine("sqlite://", creator=lambda: conn, poolclass=StaticPool)
+    literal_us = run_sqlalchemy(engine, literal)
+    param_us = run_sqlalchemy(engine, parameterized)
+    print(f"{'SQLAlchemy text()':<28} {literal_us:>11.1f} {param_us:>10.1f} {literal_us / param_us:>7.1f}x")
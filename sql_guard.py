@@ -0,0 +1,266 @@
+import json
+import logging
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from langchain_community.tools.sql_database.tool import QuerySQLDatabaseTool
+
+# ---------------------------
+# GUARD METRICS
+# ---------------------------
+GUARD_METRICS = Counter()               # decision / reason -> count
+GUARD_DECISIONS = deque(maxlen=200)     # most recent decisions, newest last
+
+
+def guard_metrics():
+    """Snapshot of guard counters and the latest decisions"""
+    return {
+        "counters": dict(GUARD_METRICS),
+        "recent": list(GUARD_DECISIONS)[-20:]
+    }
+
+
+# ----------------------
+# PLAN ANALYSIS
+# ----------------------
+def _empty_plan():
+    return {"cost": None, "rows": None, "full_scans": [], "cartesian": False}
+
+
+def _walk_postgres(node, plan):
+    node_type = node.get("Node Type", "")
+    rows = node.get("Plan Rows", 0)
+    if node_type == "Seq Scan":
+        plan["full_scans"].append({"table": node.get("Relation Name"), "rows": rows})
+    if node_type == "Nested Loop" and not node.get("Join Filter"):
+        children = node.get("Plans", [])
+        inner = children[-1] if children else {}
+        if inner.get("Node Type") in ("Seq Scan", "Materialize") and not inner.get("Filter"):
+            plan["cartesian"] = True
+    for child in node.get("Plans", []):
+        _walk_postgres(child, plan)
+
+
+def _explain_postgres(conn, sql):
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    root = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+    plan = _empty_plan()
+    plan["cost"] = root.get("Total Cost")
+    plan["rows"] = root.get("Plan Rows")
+    _walk_postgres(root, plan)
+    return plan
+
+
+def _walk_mysql(node, plan):
+    if isinstance(node, list):
+        for item in node:
+            _walk_mysql(item, plan)
+        return
+    if not isinstance(node, dict):
+        return
+    table = node.get("table")
+    if isinstance(table, dict):
+        rows = table.get("rows_examined_per_scan", 0)
+        plan["rows"] = max(plan["rows"] or 0, table.get("rows_produced_per_join", 0))
+        if table.get("access_type") == "ALL":
+            plan["full_scans"].append({"table": table.get("table_name"), "rows": rows})
+            if table.get("using_join_buffer") and not table.get("attached_condition"):
+                plan["cartesian"] = True
+    for key, value in node.items():
+        if key != "table" and isinstance(value, (dict, list)):
+            _walk_mysql(value, plan)
+
+
+def _explain_mysql(conn, sql):
+    raw = conn.exec_driver_sql(f"EXPLAIN FORMAT=JSON {sql}").scalar()
+    block = json.loads(raw)["query_block"]
+    plan = _empty_plan()
+    plan["cost"] = float(block.get("cost_info", {}).get("query_cost", 0))
+    _walk_mysql(block, plan)
+    return plan
+
+
+def _explain_sqlite(conn, sql):
+    # SQLite has no cost or row estimates in EXPLAIN QUERY PLAN: report unindexed scans, and flag a
+    # cartesian join when one SELECT's loop nest has a second SCAN, i.e. an inner loop with no usable
+    # constraint. Scans in different nests (UNION arms, IN / scalar subqueries) are independent.
+    plan = _empty_plan()
+    loops = Counter()   # parent node -> SCAN loops in that nest
+    for node_id, parent, _, detail in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"):
+        if not detail.startswith("SCAN ") or detail == "SCAN CONSTANT ROW":
+            continue
+        loops[parent] += 1
+        if "USING" not in detail:
+            table = detail.replace("SCAN TABLE ", "").replace("SCAN ", "").split(" ")[0]
+            plan["full_scans"].append({"table": table, "rows": None})
+    plan["cartesian"] = any(count > 1 for count in loops.values())
+    return plan
+
+
+EXPLAINERS = {
+    "postgresql": _explain_postgres,
+    "mysql": _explain_mysql,
+    "mariadb": _explain_mysql,
+    "sqlite": _explain_sqlite,
+}
+
+
+# ----------------------
+# QUERY GUARD
+# ----------------------
+class QueryGuard:
+    """Checks agent-generated SQL with EXPLAIN and runs it under a timeout and row cap"""
+
+    def __init__(self, engine, max_cost=1_000_000, max_rows=1_000_000, max_full_scan_rows=100_000,
+                 reject_cartesian=True, timeout_s=30, row_cap=1000):
+        self.engine = engine
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.max_full_scan_rows = max_full_scan_rows
+        self.reject_cartesian = reject_cartesian
+        self.timeout_s = timeout_s
+        self.row_cap = row_cap
+
+    @property
+    def dialect(self):
+        return self.engine.dialect.name
+
+    def explain(self, sql: str) -> Optional[dict]:
+        explainer = EXPLAINERS.get(self.dialect)
+        if explainer is None:
+            return None
+        with self.engine.connect() as conn:
+            return explainer(conn, sql.strip().rstrip(";"))
+
+    def _record(self, decision: dict):
+        GUARD_METRICS["allowed" if decision["allowed"] else "rejected"] += 1
+        if decision.get("code"):
+            GUARD_METRICS[decision["code"]] += 1
+        GUARD_DECISIONS.append(decision)
+        log = logging.info if decision["allowed"] else logging.warning
+        log(f"🛡️ Query guard: {decision['code'] or 'allowed'} ({decision['reason']})")
+        return decision
+
+    def check(self, sql: str) -> dict:
+        decision = {"sql": sql, "dialect": self.dialect, "allowed": True, "code": None, "reason": "", "plan": None}
+        try:
+            plan = self.explain(sql)
+        except Exception as e:
+            decision.update(allowed=False, code="explain_failed", reason=f"EXPLAIN failed: {e}")
+            return self._record(decision)
+
+        if plan is None:
+            decision.update(code="unguarded", reason=f"EXPLAIN not supported for {self.dialect}")
+            return self._record(decision)
+
+        decision["plan"] = plan
+        big_scans = [s for s in plan["full_scans"] if (s["rows"] or 0) > self.max_full_scan_rows]
+        if self.reject_cartesian and plan["cartesian"]:
+            decision.update(allowed=False, code="rejected_cartesian",
+                            reason="plan contains a cartesian join (join without a join condition)")
+        elif plan["cost"] is not None and plan["cost"] > self.max_cost:
+            decision.update(allowed=False, code="rejected_cost",
+                            reason=f"estimated cost {plan['cost']:.0f} exceeds {self.max_cost}")
+        elif plan["rows"] is not None and plan["rows"] > self.max_rows:
+            decision.update(allowed=False, code="rejected_rows",
+                            reason=f"estimated rows {plan['rows']} exceed {self.max_rows}")
+        elif big_scans:
+            tables = ", ".join(s["table"] for s in big_scans)
+            decision.update(allowed=False, code="rejected_full_scan",
+                            reason=f"full table scan on large table(s): {tables}")
+        else:
+            decision["reason"] = "plan within limits"
+        return self._record(decision)
+
+    @contextmanager
+    def _statement_timeout(self, conn):
+        timeout_ms = int(self.timeout_s * 1000)
+        if self.dialect == "postgresql":
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+            yield
+        elif self.dialect in ("mysql", "mariadb"):
+            # Session variables outlive the checkout on pooled connections: put the old value back
+            if getattr(conn.dialect, "is_mariadb", False):
+                variable, value = "max_statement_time", self.timeout_s
+            else:
+                variable, value = "max_execution_time", timeout_ms
+            previous = conn.exec_driver_sql(f"SELECT @@SESSION.{variable}").scalar()
+            conn.exec_driver_sql(f"SET SESSION {variable} = {value}")
+            try:
+                yield
+            finally:
+                try:
+                    conn.exec_driver_sql(f"SET SESSION {variable} = {previous}")
+                except Exception:
+                    conn.invalidate()  # don't return a connection with the timeout still set
+        elif self.dialect == "sqlite":
+            raw = conn.connection.dbapi_connection
+            deadline = time.monotonic() + self.timeout_s
+            raw.set_progress_handler(lambda: int(time.monotonic() > deadline), 10_000)
+            try:
+                yield
+            finally:
+                raw.set_progress_handler(None, 0)
+        else:
+            yield
+
+    def execute(self, sql: str) -> str:
+        """Run a checked query; returns the result the same way SQLDatabase.run does"""
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                with self._statement_timeout(conn):
+                    result = conn.exec_driver_sql(sql.strip().rstrip(";"))
+                    if not result.returns_rows:
+                        return ""
+                    rows = result.fetchmany(self.row_cap + 1)
+        except Exception as e:
+            if time.perf_counter() - start >= self.timeout_s:
+                GUARD_METRICS["timeouts"] += 1
+                return f"Error: query exceeded the {self.timeout_s}s statement timeout. Rewrite it to be more selective."
+            return f"Error: {e}"
+
+        truncated = len(rows) > self.row_cap
+        if truncated:
+            GUARD_METRICS["truncated"] += 1
+            rows = rows[:self.row_cap]
+        output = str([tuple(row) for row in rows])
+        if truncated:
+            output += f"\n(Result truncated to {self.row_cap} rows.)"
+        return output
+
+
+# ----------------------
+# AGENT TOOL HOOK
+# ----------------------
+class GuardedQuerySQLDataBaseTool(QuerySQLDatabaseTool):
+    """sql_db_query tool that runs every query through a QueryGuard first"""
+
+    guard: Any = None
+
+    def _run(self, query: str, run_manager=None) -> str:
+        decision = self.guard.check(query)
+        if not decision["allowed"]:
+            return (f"Error: query rejected by cost guard, {decision['reason']}. "
+                    f"Rewrite the query with selective WHERE filters, proper join conditions and a LIMIT.")
+        return self.guard.execute(query)
+
+
+def guard_tools(tools, guard: QueryGuard):
+    """Swap the toolkit's sql_db_query tool for the guarded version.
+
+    Raises if there is no query tool to guard, so an unguarded agent can't go unnoticed.
+    """
+    guarded, replaced = [], False
+    for tool in tools:
+        if isinstance(tool, GuardedQuerySQLDataBaseTool):
+            replaced = True
+        elif isinstance(tool, QuerySQLDatabaseTool) or tool.name == "sql_db_query":
+            tool = GuardedQuerySQLDataBaseTool(db=tool.db, description=tool.description, guard=guard)
+            replaced = True
+        guarded.append(tool)
+    if not replaced:
+        raise ValueError(f"No sql_db_query tool to guard among: {[tool.name for tool in tools]}")
+    return guarded
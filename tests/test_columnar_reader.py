@@ -0,0 +1,21 @@
+from sqlalchemy import Boolean, Column, Integer, MetaData, String, Table, create_engine, insert, select
+
+from columnar_reader import read_columnar_blocks, table_dtypes
+
+
+def test_read_columnar_blocks_keeps_columns_of_empty_table():
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    table = Table("t", metadata, Column("id", Integer), Column("name", String), Column("flag", Boolean))
+    metadata.create_all(engine)
+
+    with engine.connect() as conn:
+        empty = list(read_columnar_blocks(conn.execute(select(table)), table_dtypes(table), block_rows=2))
+        conn.execute(insert(table), [{"id": i, "name": str(i), "flag": i % 2 == 0} for i in range(3)])
+        blocks = list(read_columnar_blocks(conn.execute(select(table)), table_dtypes(table), block_rows=2))
+
+    assert len(empty) == 1 and empty[0].empty
+    assert list(empty[0].columns) == ["id", "name", "flag"]
+    assert [str(dtype) for dtype in empty[0].dtypes] == ["int64", "object", "bool"]
+    assert [len(block) for block in blocks] == [2, 1]
+    assert list(blocks[1].columns) == ["id", "name", "flag"]
@@ -0,0 +1,19 @@
+import sqlite3
+
+from join_planner import JoinPlanner
+
+
+def test_fk_without_column_list_joins_on_parent_primary_key():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE p (code TEXT, region TEXT, name TEXT, PRIMARY KEY (code, region));
+        CREATE TABLE q (id INTEGER PRIMARY KEY);
+        CREATE TABLE ch (id INTEGER PRIMARY KEY, pcode TEXT, pregion TEXT, qid INTEGER REFERENCES q,
+                         FOREIGN KEY (pcode, pregion) REFERENCES p);
+    """)
+    planner = JoinPlanner.from_sqlite(conn)
+
+    assert planner.plan("ch", {"p", "q"}) == [
+        ("p", "ch", [("pcode", "code"), ("pregion", "region")]),
+        ("q", "ch", [("qid", "id")]),
+    ]
@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+from result_cache import ColumnarFrame
+
+
+def test_columnar_frame_round_trip_keeps_dtypes():
+    frame = pd.DataFrame({
+        "id": np.arange(4),
+        "score": [0.5, np.nan, 1.5, 2.0],
+        "count": pd.array([1, None, 3, 4], dtype="Int64"),
+        "small": pd.array([1, 2, None, 4], dtype="Int32"),
+        "flag": pd.array([True, None, False, True], dtype="boolean"),
+        "name": ["a", None, "ccc", "dd"],
+    })
+    restored = ColumnarFrame(frame).to_frame()
+
+    assert restored.dtypes.to_dict() == frame.dtypes.to_dict()
+    pd.testing.assert_frame_equal(restored, frame)
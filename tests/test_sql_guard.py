@@ -0,0 +1,16 @@
+from langchain_community.agent_toolkits import SQLDatabaseToolkit
+from langchain_community.utilities import SQLDatabase
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from sql_guard import GuardedQuerySQLDataBaseTool, QueryGuard, guard_tools
+
+
+def test_guard_tools_wraps_toolkit_query_tool():
+    db = SQLDatabase.from_uri("sqlite://")
+    toolkit = SQLDatabaseToolkit(db=db, llm=FakeListChatModel(responses=["ok"]))
+    tools = guard_tools(toolkit.get_tools(), QueryGuard(db._engine))
+
+    query_tools = [tool for tool in tools if tool.name == "sql_db_query"]
+    assert len(query_tools) == 1
+    assert isinstance(query_tools[0], GuardedQuerySQLDataBaseTool)
+    assert query_tools[0].run("SELECT 1") == "[(1,)]"
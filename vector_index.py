@@ -0,0 +1,299 @@
+import os
+
+import numpy as np
+
+
+def normalize_rows(vectors):
+    """float32 copy of `vectors` with unit-length rows (zero rows stay zero)"""
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, k):
+    """Indices of the k highest scores, best first, without sorting everything"""
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+    return np.take_along_axis(part, order, axis=-1)
+
+
+INDEX_DTYPES = ("float32", "float16", "int8")
+
+# Default in-memory index precision for every index in the app. int8 is 4x smaller than
+# float32 at ~1.5x the query time; float16 is 2x smaller but ~6x slower, since NumPy has
+# no fast float16 matmul (see quantization_benchmark.py)
+INDEX_DTYPE = os.getenv("INDEX_DTYPE", "float32")
+
+
+def quantize(matrix, dtype):
+    """Store unit rows as float32, float16, or int8 with one float32 scale per row"""
+    if dtype == "float32":
+        return matrix, None
+    if dtype == "float16":
+        return matrix.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.round(matrix / scales[:, None]).astype(np.int8)
+        return data, scales.astype(np.float32)
+    raise ValueError(f"Unsupported index dtype: {dtype} (use one of {INDEX_DTYPES})")
+
+
+class VectorIndex:
+    """Exact cosine-similarity search over a pre-normalized matrix.
+
+    Scoring a prompt is one matrix-vector product and top-k selection uses
+    argpartition, so nothing is looped over in Python. With dtype="float16"
+    or "int8" the matrix is stored quantized and dequantized block by block
+    while scoring, so only one block is ever held in float32.
+    """
+
+    BLOCK_ROWS = 1024  # rows dequantized at a time; small enough to stay in cache
+
+    def __init__(self, keys, vectors, payloads=None, dtype="float32"):
+        self.keys = list(keys)
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        self.payloads = list(payloads) if payloads is not None else [None] * len(self.keys)
+        self.dtype = dtype
+        self.scales = None
+        if len(self.keys):
+            self.matrix, self.scales = quantize(normalize_rows(vectors), dtype)
+        else:
+            self.matrix = np.empty((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def nbytes(self):
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def add(self, keys, vectors, payloads=None):
+        """Append new entries, e.g. the columns of a newly registered schema"""
+        keys = list(keys)
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        rows, scales = quantize(normalize_rows(vectors), self.dtype)
+        start = len(self.keys)
+        self.matrix = rows if start == 0 else np.vstack([self.matrix, rows])
+        if scales is not None:
+            self.scales = scales if start == 0 else np.concatenate([self.scales, scales])
+        self.rows.update((key, start + i) for i, key in enumerate(keys))
+        self.keys.extend(keys)
+        self.payloads.extend(payloads if payloads is not None else [None] * len(keys))
+        return np.arange(start, start + len(keys))
+
+    def rows_float32(self, rows):
+        """Dequantized copy of the given rows (a slice or an index array)"""
+        block = self.matrix[rows]
+        if self.dtype == "float32":
+            return block
+        block = block.astype(np.float32)
+        if self.scales is not None:
+            block *= self.scales[rows][:, None]
+        return block
+
+    def _scores(self, queries, rows=None):
+        """queries (q, d) float32 against rows -> (q, n) scores, one block at a time"""
+        if self.dtype == "float32":
+            block = self.matrix if rows is None else self.matrix[rows]
+            return queries @ block.T
+        if rows is None:
+            rows = slice(0, len(self.keys))
+        if isinstance(rows, slice):
+            starts = range(rows.start, rows.stop, self.BLOCK_ROWS)
+            parts = [slice(s, min(s + self.BLOCK_ROWS, rows.stop)) for s in starts]
+        else:
+            rows = np.asarray(rows)
+            parts = [rows[s:s + self.BLOCK_ROWS] for s in range(0, len(rows), self.BLOCK_ROWS)]
+        if not parts:
+            return np.empty((queries.shape[0], 0), dtype=np.float32)
+        return np.concatenate([self._block_scores(queries, part) for part in parts], axis=1)
+
+    def _block_scores(self, queries, part):
+        block = self.matrix[part].astype(np.float32)
+        if self.scales is None:
+            return queries @ block.T
+        # Row scales factor out of the dot product: scale the scores, not the block
+        return (queries @ block.T) * self.scales[part]
+
+    def _result(self, row, score):
+        return self.keys[row], float(score), self.payloads[row]
+
+    def search(self, query, top_k=3, candidates=None):
+        """[(key, score, payload)] best first; `candidates` restricts the search to those rows"""
+        query = normalize_rows(query)
+        scores = self._scores(query, candidates)[0]
+        best = top_k_indices(scores, top_k)
+        rows = best if candidates is None else np.asarray(candidates)[best]
+        return [self._result(row, scores[i]) for row, i in zip(rows, best)]
+
+    def search_ranges(self, query, ranges, top_k=3):
+        """search() restricted to row ranges [(start, end)], reading only those rows"""
+        query = normalize_rows(query)
+        # Slices are views: only the requested blocks are read
+        scores = np.concatenate([self._scores(query, slice(start, end))[0] for start, end in ranges])
+        rows = np.concatenate([np.arange(start, end) for start, end in ranges])
+        best = top_k_indices(scores, top_k)
+        return [self._result(rows[i], scores[i]) for i in best]
+
+    def search_keys(self, query, keys, top_k=3):
+        """Exact search over just the given keys (e.g. lexical candidates)"""
+        rows = [self.rows[key] for key in keys if key in self.rows]
+        if not rows:
+            return []
+        return VectorIndex.search(self, query, top_k=top_k, candidates=np.asarray(rows))
+
+    def search_batch(self, queries, top_k=3):
+        """search() for many queries at once with a single matrix product"""
+        queries = normalize_rows(queries)
+        scores = self._scores(queries)
+        best = top_k_indices(scores, top_k)
+        return [
+            [self._result(row, scores[q, row]) for row in best[q]]
+            for q in range(queries.shape[0])
+        ]
+
+
+def spherical_kmeans(matrix, n_clusters, n_iter=20, seed=0):
+    """k-means on unit vectors using cosine similarity; returns unit centroids"""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, matrix.shape[0])
+    centroids = matrix[rng.choice(matrix.shape[0], n_clusters, replace=False)].copy()
+    for _ in range(n_iter):
+        assignment = np.argmax(matrix @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, matrix)
+        counts = np.bincount(assignment, minlength=n_clusters)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random points
+            sums[empty] = matrix[rng.choice(matrix.shape[0], int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+class IVFIndex(VectorIndex):
+    """Approximate search with an inverted file over k-means cells.
+
+    Only the `n_probe` cells whose centroids are closest to the query are
+    scanned. Larger n_probe means better recall and higher latency;
+    n_probe == n_lists is exact search.
+    """
+
+    MAX_TRAINING_ROWS = 100_000
+    ASSIGN_BLOCK_ROWS = 16_384  # rows assigned to cells per matrix product
+
+    def __init__(self, keys, vectors, payloads=None, n_lists=None, n_probe=8, n_iter=20, seed=0, dtype="float32"):
+        super().__init__(keys, vectors, payloads, dtype=dtype)
+        n = len(self.keys)
+        self.n_lists = n_lists or max(1, int(np.sqrt(n)))
+        self.n_probe = n_probe
+        # Centroids are learned from a sample; every row is still assigned to a cell
+        rng = np.random.default_rng(seed)
+        sample = np.sort(rng.choice(n, min(n, self.MAX_TRAINING_ROWS), replace=False))
+        self.centroids = spherical_kmeans(self.rows_float32(sample), self.n_lists, n_iter=n_iter, seed=seed)
+        self.lists = [np.empty(0, dtype=np.int64) for _ in range(self.centroids.shape[0])]
+        self._assign(np.arange(n))
+
+    def _assign(self, rows):
+        # Block by block, so assigning a big catalog never holds a full copy of
+        # the matrix or an n_lists x n score matrix
+        cells = np.empty(len(rows), dtype=np.int64)
+        for start in range(0, len(rows), self.ASSIGN_BLOCK_ROWS):
+            block = rows[start:start + self.ASSIGN_BLOCK_ROWS]
+            cells[start:start + len(block)] = np.argmax(self._scores(self.centroids, block), axis=0)
+        order = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(self.centroids.shape[0] + 1))
+        for cell in range(self.centroids.shape[0]):
+            new = rows[order[bounds[cell]:bounds[cell + 1]]]
+            if len(new):
+                self.lists[cell] = np.concatenate([self.lists[cell], new])
+
+    def add(self, keys, vectors, payloads=None):
+        """Insert without retraining; new rows go to their nearest existing cell"""
+        rows = super().add(keys, vectors, payloads)
+        if len(rows):
+            self._assign(rows)
+        return rows
+
+    def _probe(self, query, n_probe):
+        cells = top_k_indices(self.centroids @ query, n_probe)
+        return np.concatenate([self.lists[c] for c in cells])
+
+    def search(self, query, top_k=3, candidates=None, n_probe=None):
+        query = normalize_rows(query)[0]
+        rows = self._probe(query, n_probe or self.n_probe)
+        if candidates is not None:
+            rows = np.intersect1d(rows, candidates, assume_unique=True)
+        return super().search(query, top_k=top_k, candidates=rows)
+
+    def search_batch(self, queries, top_k=3, n_probe=None):
+        return [self.search(q, top_k=top_k, n_probe=n_probe) for q in normalize_rows(queries)]
+
+
+class PartitionedVectorIndex:
+    """Index whose rows are grouped into contiguous blocks per partition (e.g. table).
+
+    A lookup scoped to some partitions only touches those blocks; an
+    unscoped lookup goes through the wrapped index (exact or IVF).
+    """
+
+    def __init__(self, keys, vectors, partitions, payloads=None, index_cls=VectorIndex, **index_kwargs):
+        keys, partitions = list(keys), list(partitions)
+        payloads = list(payloads) if payloads is not None else [None] * len(keys)
+        order = self._grouped_order(partitions)
+        vectors = np.asarray(vectors)[order] if len(keys) else vectors
+        self.index = index_cls([keys[i] for i in order], vectors, [payloads[i] for i in order], **index_kwargs)
+        self.offsets = {}  # partition -> [(start, end)]
+        self._record_offsets([partitions[i] for i in order], start=0)
+
+    @staticmethod
+    def _grouped_order(partitions):
+        first_seen = {}
+        for p in partitions:
+            first_seen.setdefault(p, len(first_seen))
+        return sorted(range(len(partitions)), key=lambda i: first_seen[partitions[i]])
+
+    def _record_offsets(self, partitions, start):
+        row = start
+        for i, p in enumerate(partitions):
+            if i == 0 or p != partitions[i - 1]:
+                self.offsets.setdefault(p, []).append([row, row])
+            self.offsets[p][-1][1] = row + 1
+            row += 1
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, keys, vectors, partitions, payloads=None):
+        """Append rows; each new partition becomes its own contiguous block"""
+        keys, partitions = list(keys), list(partitions)
+        payloads = list(payloads) if payloads is not None else [None] * len(keys)
+        order = self._grouped_order(partitions)
+        start = len(self.index)
+        self.index.add([keys[i] for i in order], np.asarray(vectors)[order], [payloads[i] for i in order])
+        self._record_offsets([partitions[i] for i in order], start=start)
+
+    def ranges(self, partitions):
+        return [tuple(r) for p in partitions for r in self.offsets.get(p, [])]
+
+    def search_keys(self, query, keys, top_k=3):
+        return self.index.search_keys(query, keys, top_k=top_k)
+
+    def search(self, query, top_k=3, partitions=None):
+        """Search everything, one partition (str) or several (list)"""
+        if partitions is None:
+            return self.index.search(query, top_k=top_k)
+        if isinstance(partitions, str):
+            partitions = [partitions]
+        ranges = self.ranges(partitions)
+        if not ranges:
+            return []
+        return self.index.search_ranges(query, ranges, top_k=top_k)